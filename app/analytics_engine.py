@@ -0,0 +1,290 @@
+# In app/analytics_engine.py
+
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from . import models, crud
+from .database import sync_session_like
+
+PICK, BAN = 0, 1
+NO_SIDE, BLUE, RED = 0, 1, 2
+NO_DAY = -1
+
+# --- Column Store ---
+# Every pick/ban row of every match with a recorded winner, as parallel NumPy
+# arrays. Heroes, teams and tournaments are coded by their database ids;
+# stages by position in a name table. Data is loaded per tournament and a
+# tournament is reloaded when its data_version changes, so a worker commit
+# only costs re-reading the tournaments it touched, on a background thread.
+
+class _TournamentChunk:
+    """Column arrays for one tournament, as loaded from the database."""
+
+    def __init__(self, db: Session, tournament_id: int, stage_code):
+        matches = db.execute(
+            select(models.Match.id, models.Match.stage_type, models.Match.team1_id, models.Match.team2_id, models.Match.match_date)
+            .where(models.Match.tournament_id == tournament_id)
+            .where(models.Match.winner_id != None)
+            .order_by(models.Match.id)
+        ).all()
+        self.match_id = np.array([m.id for m in matches], dtype=np.int64)
+        self.match_stage = np.array([stage_code(m.stage_type) for m in matches], dtype=np.int32)
+        self.match_team1 = np.array([m.team1_id for m in matches], dtype=np.int32)
+        self.match_team2 = np.array([m.team2_id for m in matches], dtype=np.int32)
+        self.match_tournament = np.full(len(matches), tournament_id, dtype=np.int32)
+        # Day ordinal of the match date, NO_DAY without one
+        self.match_day = np.array([m.match_date.toordinal() if m.match_date else NO_DAY for m in matches], dtype=np.int32)
+
+        rows = db.execute(
+            select(
+                models.MatchHero.match_id, models.MatchHero.game_number, models.MatchHero.hero_id,
+                models.MatchHero.team_id, models.MatchHero.type, models.MatchHero.side, models.MatchHero.is_win
+            )
+            .join(models.Match, models.Match.id == models.MatchHero.match_id)
+            .where(models.Match.tournament_id == tournament_id)
+            .where(models.Match.winner_id != None)
+        ).all()
+        # Position of each row's match within this chunk
+        self.row_match = np.searchsorted(self.match_id, np.array([r.match_id for r in rows], dtype=np.int64)).astype(np.int32)
+        self.game_number = np.array([r.game_number for r in rows], dtype=np.int16)
+        self.hero = np.array([r.hero_id for r in rows], dtype=np.int32)
+        self.team = np.array([r.team_id for r in rows], dtype=np.int32)
+        self.action = np.array([PICK if r.type == 'pick' else BAN for r in rows], dtype=np.int8)
+        self.side = np.array([BLUE if r.side == 'blue' else RED if r.side == 'red' else NO_SIDE for r in rows], dtype=np.int8)
+        self.is_win = np.array([1 if r.is_win else 0 for r in rows], dtype=np.int8)
+
+
+class _Columns:
+    """The concatenated arrays queries run on. Replaced wholesale on refresh, never mutated."""
+
+    MATCH_COLUMNS = ("match_id", "match_stage", "match_team1", "match_team2", "match_tournament", "match_day")
+    ROW_COLUMNS = ("game_number", "hero", "team", "action", "side", "is_win")
+
+    def __init__(self, chunks: List[_TournamentChunk], hero_names: Dict[int, str], team_names: Dict[int, str]):
+        self.hero_names = hero_names
+        self.team_names = team_names
+        for name in self.MATCH_COLUMNS + self.ROW_COLUMNS:
+            arrays = [getattr(chunk, name) for chunk in chunks]
+            setattr(self, name, np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int32))
+
+        offsets = np.cumsum([0] + [len(chunk.match_id) for chunk in chunks[:-1]])
+        row_match = [chunk.row_match.astype(np.int64) + offset for chunk, offset in zip(chunks, offsets)]
+        self.row_match = np.concatenate(row_match) if row_match else np.zeros(0, dtype=np.int64)
+
+        # Dense id per (match, game), for distinct-game counts and same-game joins
+        _, self.row_game = np.unique(self.row_match * 1000 + self.game_number, return_inverse=True)
+        self.row_game = self.row_game.reshape(-1)
+        self.game_count = int(self.row_game.max()) + 1 if len(self.row_game) else 0
+
+        self.hero_slots = max(hero_names, default=0) + 1
+        self.team_slots = max(team_names, default=0) + 1
+
+
+class AnalyticsEngine:
+    def __init__(self):
+        self._lock = threading.Lock() # Held by the one reload in progress
+        self._chunks: Dict[int, _TournamentChunk] = {}
+        self._stage_codes: Dict[Optional[str], int] = {}
+        # (columns, {tournament id: data_version}), swapped as one so readers
+        # always see columns with the versions they were loaded from
+        self._snapshot = (_Columns([], {}, {}), {})
+
+    def _stage_code(self, stage: Optional[str]) -> int:
+        return self._stage_codes.setdefault(stage, len(self._stage_codes))
+
+    def reload(self, db: Session):
+        """
+        Re-reads the tournaments whose data_version changed since the last
+        load and swaps in the new columns. Blocks; requests trigger it in the
+        background through sync().
+        """
+        with self._lock:
+            self._reload(db)
+
+    def _reload(self, db: Session):
+        current = dict(db.execute(select(models.Tournament.id, models.Tournament.data_version)).all())
+        loaded = self._snapshot[1]
+        if current == loaded:
+            return
+        for t_id in [t_id for t_id, version in current.items() if loaded.get(t_id) != version]:
+            self._chunks[t_id] = _TournamentChunk(db, t_id, self._stage_code)
+        for t_id in set(self._chunks) - set(current):
+            del self._chunks[t_id]
+        columns = _Columns(
+            [self._chunks[t_id] for t_id in sorted(self._chunks)],
+            dict(db.execute(select(models.Hero.id, models.Hero.name)).all()),
+            dict(db.execute(select(models.Team.id, models.Team.name)).all()),
+        )
+        self._snapshot = (columns, current)
+
+    def _reload_in_background(self, db: Session):
+        try:
+            with db:
+                self._reload(db)
+        except Exception as e:
+            print(f"Analytics engine reload failed: {e}")
+        finally:
+            self._lock.release()
+
+    def sync(self, db: Session, tournament_names=None) -> Optional[_Columns]:
+        """
+        Returns the loaded columns if they are current for the given
+        tournaments (every tournament without a filter) and for the current
+        heroes and teams, else None, and the caller answers from SQL. When any tournament's data_version changed,
+        a reload starts on a background thread; until it finishes, queries on
+        unchanged tournaments keep using the old columns. Stale columns are
+        never used for a changed tournament, as the response is cached and
+        ETagged under the new data version.
+        """
+        columns, loaded = self._snapshot
+        current = db.execute(select(models.Tournament.id, models.Tournament.name, models.Tournament.data_version)).all()
+        if len(current) == len(loaded) and all(loaded.get(t_id) == version for t_id, _, version in current):
+            return columns
+        if self._lock.acquire(blocking=False):
+            # Its own sync session on the same database; `db` belongs to the request
+            threading.Thread(target=self._reload_in_background, args=(sync_session_like(db),), daemon=True).start()
+        if not tournament_names:
+            return None
+        wanted = set(tournament_names)
+        if any(loaded.get(t_id) != version for t_id, name, version in current if name in wanted):
+            return None
+        # The name tables must be current too: heroes and teams are only ever
+        # added, so equal counts mean no new ones
+        heroes, teams = db.execute(select(
+            select(func.count()).select_from(models.Hero).scalar_subquery(),
+            select(func.count()).select_from(models.Team).scalar_subquery(),
+        )).one()
+        if heroes != len(columns.hero_names) or teams != len(columns.team_names):
+            return None
+        return columns
+
+    # --- Filters ---
+
+    def _ids_for(self, names, lookup: Dict[int, str]):
+        wanted = set(names)
+        return np.array([i for i, name in lookup.items() if name in wanted], dtype=np.int32)
+
+    def _team_ids(self, team_names, cols: _Columns):
+        # Like crud._team_ids: unknown names are ignored, and none known means no team filter
+        team_ids = self._ids_for(team_names, cols.team_names) if team_names else None
+        return team_ids if team_ids is not None and len(team_ids) else None
+
+    def _match_mask(self, db: Session, cols: _Columns, tournament_names, stage_names, team_ids, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        mask = np.ones(len(cols.match_id), dtype=bool)
+        if tournament_names:
+            tournament_ids = db.execute(select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))).scalars().all()
+            mask &= np.isin(cols.match_tournament, tournament_ids)
+        if stage_names:
+            mask &= np.isin(cols.match_stage, [self._stage_codes[s] for s in stage_names if s in self._stage_codes])
+        if team_ids is not None:
+            mask &= np.isin(cols.match_team1, team_ids) | np.isin(cols.match_team2, team_ids)
+        if date_from:
+            mask &= cols.match_day >= date_from.toordinal()
+        if date_to:
+            mask &= (cols.match_day <= date_to.toordinal()) & (cols.match_day != NO_DAY)
+        return mask
+
+    # --- Queries (same results as crud.get_hero_stats / crud.get_hero_details) ---
+
+    def get_hero_stats(self, db: Session, tournament_names=None, stage_names=None, team_names=None, date_from=None, date_to=None):
+        cols = self.sync(db, tournament_names)
+        if cols is None:
+            return crud.get_hero_stats(db, tournament_names, stage_names, team_names, date_from, date_to)
+        team_ids = self._team_ids(team_names, cols)
+        match_mask = self._match_mask(db, cols, tournament_names, stage_names, team_ids, date_from, date_to)
+        total_matches = int(match_mask.sum())
+        if total_matches == 0:
+            return {"summary": {"total_matches": 0, "total_games": 0, "total_heroes": 0}, "heroes": []}
+
+        rows = match_mask[cols.row_match]
+        total_games = int(np.count_nonzero(np.bincount(cols.row_game[rows], minlength=cols.game_count)))
+        if total_games == 0:
+            return {"summary": {"total_matches": total_matches, "total_games": 0, "total_heroes": 0}, "heroes": []}
+
+        def count(extra=None):
+            selected = rows if extra is None else rows & extra
+            return np.bincount(cols.hero[selected], minlength=cols.hero_slots)
+
+        is_pick, is_win = cols.action == PICK, cols.is_win == 1
+        blue, red = cols.side == BLUE, cols.side == RED
+        picks, bans, wins = count(is_pick), count(cols.action == BAN), count(is_pick & is_win)
+        blue_picks, blue_wins = count(is_pick & blue), count(is_pick & blue & is_win)
+        red_picks, red_wins = count(is_pick & red), count(is_pick & red & is_win)
+
+        hero_stats = []
+        for hero_id in sorted(np.flatnonzero(picks + bans), key=lambda h: cols.hero_names[h]):
+            p, b, w = int(picks[hero_id]), int(bans[hero_id]), int(wins[hero_id])
+            hero_stats.append({
+                "hero_name": cols.hero_names[hero_id], "picks": p, "bans": b, "wins": w,
+                "losses": p - w,
+                "win_rate": (w / p * 100) if p > 0 else 0,
+                "pick_rate": (p / total_games * 100) if total_games > 0 else 0,
+                "ban_rate": (b / total_games * 100) if total_games > 0 else 0,
+                "presence": ((p + b) / total_games * 100) if total_games > 0 else 0,
+                "blue_picks": int(blue_picks[hero_id]), "blue_wins": int(blue_wins[hero_id]),
+                "red_picks": int(red_picks[hero_id]), "red_wins": int(red_wins[hero_id]),
+            })
+
+        summary = { "total_matches": total_matches, "total_games": total_games, "total_heroes": len(hero_stats), "most_picked": max(hero_stats, key=lambda x: x['picks']) if hero_stats else None, "highest_win_rate": max([h for h in hero_stats if h['picks'] >= 5], key=lambda x: x['win_rate']) if any(h['picks'] >= 5 for h in hero_stats) else None, }
+        return {"summary": summary, "heroes": hero_stats}
+
+    def get_hero_details(self, db: Session, hero_name: str, tournament_names=None, stage_names=None, team_names=None, date_from=None, date_to=None):
+        return self.get_hero_details_batch(db, [hero_name], tournament_names, stage_names, team_names, date_from, date_to)[hero_name]
+
+    def get_hero_details_batch(self, db: Session, hero_names=None, tournament_names=None, stage_names=None, team_names=None, date_from=None, date_to=None):
+        cols = self.sync(db, tournament_names)
+        if cols is None:
+            return crud.get_hero_details_batch(db, hero_names, tournament_names, stage_names, team_names, date_from, date_to)
+        hero_ids = self._ids_for(hero_names, cols.hero_names) if hero_names is not None else np.array(list(cols.hero_names), dtype=np.int32)
+        details = {name: {"by_team": [], "vs_opponents": []} for name in (hero_names if hero_names is not None else cols.hero_names.values())}
+        if len(hero_ids) == 0:
+            return details
+
+        team_ids = self._team_ids(team_names, cols)
+        rows = self._match_mask(db, cols, tournament_names, stage_names, team_ids, date_from, date_to)[cols.row_match] & (cols.action == PICK)
+        for hero_id in hero_ids:
+            details[cols.hero_names[int(hero_id)]] = self._hero_details(cols, rows, team_ids, int(hero_id))
+        return details
+
+    def _hero_details(self, cols: _Columns, rows, team_ids, hero_id: int):
+        hero_rows = rows & (cols.hero == hero_id)
+
+        # Performance by team
+        team_rows = hero_rows if team_ids is None else hero_rows & np.isin(cols.team, team_ids)
+        games = np.bincount(cols.team[team_rows], minlength=cols.team_slots)
+        wins = np.bincount(cols.team[team_rows], weights=cols.is_win[team_rows], minlength=cols.team_slots)
+        by_team = [
+            {"team_name": cols.team_names[t], "games_played": int(games[t]), "wins": int(wins[t]), "win_rate": (int(wins[t]) / int(games[t]) * 100) if games[t] > 0 else 0}
+            for t in np.flatnonzero(games)
+        ]
+        by_team.sort(key=lambda r: (-r["games_played"], r["team_name"]))
+
+        # Performance vs. opponents: picks by the other team in the same games
+        hero_team_by_game = np.full(cols.game_count, -1, dtype=np.int32)
+        hero_win_by_game = np.zeros(cols.game_count, dtype=np.int8)
+        hero_team_by_game[cols.row_game[hero_rows]] = cols.team[hero_rows]
+        hero_win_by_game[cols.row_game[hero_rows]] = cols.is_win[hero_rows]
+        game_team = hero_team_by_game[cols.row_game]
+        opponent_rows = rows & (game_team != -1) & (cols.team != game_team)
+        faced = np.bincount(cols.hero[opponent_rows], minlength=cols.hero_slots)
+        won = np.bincount(cols.hero[opponent_rows], weights=hero_win_by_game[cols.row_game[opponent_rows]], minlength=cols.hero_slots)
+        vs_opponents = [
+            {"opponent_hero_name": cols.hero_names[h], "games_faced": int(faced[h]), "wins_against": int(won[h]), "win_rate_vs": (int(won[h]) / int(faced[h]) * 100) if faced[h] > 0 else 0}
+            for h in np.flatnonzero(faced)
+        ]
+        vs_opponents.sort(key=lambda r: (-r["games_faced"], r["opponent_hero_name"]))
+
+        return {"by_team": by_team, "vs_opponents": vs_opponents}
+
+
+_engine = None
+
+def get_engine() -> AnalyticsEngine:
+    """Returns the shared engine. The API only uses it with ANALYTICS_ENGINE=memory (see app/main.py)."""
+    global _engine
+    if _engine is None:
+        _engine = AnalyticsEngine()
+    return _engine
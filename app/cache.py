@@ -0,0 +1,223 @@
+# In app/cache.py
+
+import os
+import json
+import asyncio
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+from . import crud
+from .serialization import EncodedPayload, choose_encoding, supported_encodings
+
+load_dotenv()
+
+# --- Configuration ---
+# CACHE_BACKEND: 'memory' (default), 'redis', or 'off'
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# CACHE_PRE_ENCODED: cache async endpoint responses as encoded (and
+# compressed) bytes rather than Python values, so hits skip serialization.
+CACHE_PRE_ENCODED = os.getenv("CACHE_PRE_ENCODED", "true").lower() == "true"
+
+_MISSING = object()
+
+# --- Backends ---
+
+class InMemoryCache:
+    """A thread-safe LRU cache with a per-entry TTL, bounded by entry count."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """
+    Shares cached responses between API processes. Entries expire via Redis TTLs;
+    a sorted set of last-access times enforces the LRU size bound.
+    """
+
+    def __init__(self, url: str = REDIS_URL, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL_SECONDS, prefix: str = "mlbb:cache:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self.index_key = f"{prefix}lru"
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        self.client.zadd(self.index_key, {key: time.time()})
+        if EncodedPayload.is_framed(raw):
+            return EncodedPayload.from_bytes(raw)
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any):
+        raw = value.to_bytes() if isinstance(value, EncodedPayload) else json.dumps(value)
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, raw, ex=self.ttl)
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = self.client.zpopmin(self.index_key, size - self.max_entries)
+            if evicted:
+                self.client.delete(*[self.prefix + k.decode() for k, _score in evicted])
+
+    def clear(self):
+        keys = [self.prefix + k.decode() for k in self.client.zrange(self.index_key, 0, -1)]
+        self.client.delete(self.index_key, *keys)
+
+
+_cache = None
+
+def get_cache():
+    """Returns the configured cache backend, or None when caching is off."""
+    global _cache
+    if _cache is None and CACHE_BACKEND != "off":
+        _cache = RedisCache() if CACHE_BACKEND == "redis" else InMemoryCache()
+    return _cache
+
+# --- HTTP Caching ---
+# Responses carry an ETag derived from the data version, so clients and CDNs
+# can revalidate with If-None-Match and get a 304 until the next ingestion.
+# HTTP_MAX_AGE applies to browsers, HTTP_S_MAXAGE to shared caches (CDNs);
+# within HTTP_STALE_WHILE_REVALIDATE seconds after that, a stale copy may be
+# served while it is revalidated in the background.
+HTTP_MAX_AGE = int(os.getenv("HTTP_MAX_AGE", "0"))
+HTTP_S_MAXAGE = int(os.getenv("HTTP_S_MAXAGE", "60"))
+HTTP_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_STALE_WHILE_REVALIDATE", "30"))
+CACHE_CONTROL = f"public, max-age={HTTP_MAX_AGE}, s-maxage={HTTP_S_MAXAGE}, stale-while-revalidate={HTTP_STALE_WHILE_REVALIDATE}"
+
+def make_etag(key: str) -> str:
+    """
+    A weak ETag for a cache key. Weak because equal data may be sent with
+    different encodings (e.g. compressed or not).
+    """
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+# --- Cached Responses ---
+
+def make_key(endpoint: str, filters: Dict[str, Any], data_version: str) -> str:
+    """
+    Builds a cache key from the endpoint, its filters and the data version.
+    List filters are sorted and de-duplicated so equivalent query strings share an entry.
+    Other values (e.g. dates) are keyed by their string form.
+    """
+    normalized = {
+        name: sorted(set(value)) if isinstance(value, (list, tuple)) else value
+        for name, value in filters.items() if value
+    }
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{endpoint}:{data_version}:{digest}"
+
+async def _call_backend(cache, method: str, *args):
+    """Redis calls block, so they run in a worker thread; the in-memory cache is called directly."""
+    if isinstance(cache, RedisCache):
+        return await asyncio.to_thread(getattr(cache, method), *args)
+    return getattr(cache, method)(*args)
+
+async def cached_response_async(
+    db: AsyncSession,
+    endpoint: str,
+    filters: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+    tournament_names: Optional[list] = None,
+    request: Optional[Request] = None,
+):
+    """
+    Returns the cached value for this endpoint and filter set, awaiting
+    `compute` and storing its result on a miss. The key includes the data
+    version of the tournaments involved, so any committed ingestion makes
+    older entries unreachable.
+
+    Given the request, it returns a ready Response instead of a value: the
+    body is encoded once (fast JSON, compressed for clients that accept it),
+    and with CACHE_PRE_ENCODED the encoded bytes are what gets cached. It
+    also answers conditional requests: the ETag is derived from the cache
+    key, so a matching If-None-Match gets a 304 without `compute` running.
+    """
+    cache = get_cache()
+    if cache is None and request is None:
+        return await compute()
+
+    key = make_key(endpoint, filters, await crud.get_data_version_async(db, tournament_names))
+    if request is None:
+        return await _cached_value(cache, key, endpoint, compute)
+
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    accept_encoding = request.headers.get("accept-encoding")
+
+    if cache is None or not CACHE_PRE_ENCODED:
+        value = await compute() if cache is None else await _cached_value(cache, key, endpoint, compute)
+        # Only the coding this client gets is worth compressing
+        coding = choose_encoding(accept_encoding, supported_encodings())
+        return EncodedPayload.encode(value, [coding] if coding else []).to_response(accept_encoding, headers)
+
+    payload = await _cached_value(cache, key, endpoint, lambda: _encode(compute))
+    return payload.to_response(accept_encoding, headers)
+
+async def _encode(compute: Callable[[], Awaitable[Any]]) -> EncodedPayload:
+    return EncodedPayload.encode(await compute())
+
+async def _cached_value(cache, key: str, endpoint: str, compute: Callable[[], Awaitable[Any]]):
+    try:
+        value = await _call_backend(cache, "get", key)
+    except Exception as e:
+        print(f"Cache read failed for {endpoint}: {e}")
+        return await compute()
+    if value is not _MISSING:
+        return value
+
+    value = await compute()
+    try:
+        await _call_backend(cache, "set", key, value)
+    except Exception as e:
+        print(f"Cache write failed for {endpoint}: {e}")
+    return value
@@ -0,0 +1,236 @@
+# In app/composition_index.py
+
+import threading
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+# --- Composition Index ---
+# Answers "win rate when A and B are on the same team, against C, with D
+# banned" style questions by bitmap intersection instead of SQL self-joins.
+#
+# Every game with a recorded winner contributes two slots, one per team, and
+# a query is answered from the point of view of the slot's team ("ally")
+# against the other ("enemy"). For each (hero, pick/ban) a bitmap marks the
+# slots whose team did it; the enemy bitmap is the same with each slot pair
+# swapped. Bitmaps are NumPy bit-packed arrays, kept per tournament and
+# rebuilt when the tournament's data_version changes (i.e. after ingestion),
+# like the analytics engine's chunks. Heroes a tournament never saw have no
+# bitmap at all.
+
+ACTIONS = ("pick", "ban")
+TEAMS = ("ally", "enemy", "any")
+
+# Set bits per byte value, to count bit-packed slots
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+def _count(bits: np.ndarray) -> int:
+    return int(_POPCOUNT[bits].sum())
+
+def _swap_pairs(bits: np.ndarray) -> np.ndarray:
+    # Slot pairs (2i, 2i + 1) never straddle a byte, so swapping adjacent bits swaps teams
+    return ((bits & 0xAA) >> 1) | ((bits & 0x55) << 1)
+
+
+class Term(NamedTuple):
+    hero: str
+    action: str = "pick"
+    team: str = "ally"
+
+def parse_term(text: str) -> Term:
+    """
+    Parses 'Hero[:pick|ban[:ally|enemy|any]]', e.g. 'Tigreal',
+    'Tigreal:pick:enemy' or 'Tigreal:ban:any'. Raises ValueError.
+    """
+    hero, *rest = [part.strip() for part in text.split(":")]
+    if not hero or len(rest) > 2:
+        raise ValueError(f"Invalid composition term {text!r}; expected Hero[:pick|ban[:ally|enemy|any]]")
+    term = Term(hero, *rest)
+    if term.action not in ACTIONS:
+        raise ValueError(f"Invalid action {term.action!r} in {text!r}; expected one of {', '.join(ACTIONS)}")
+    if term.team not in TEAMS:
+        raise ValueError(f"Invalid team {term.team!r} in {text!r}; expected one of {', '.join(TEAMS)}")
+    return term
+
+def parse_terms(include: List[str], exclude: Optional[List[str]] = None):
+    """Parses include/exclude term lists for CompositionIndex.query. Raises ValueError."""
+    include_terms = [parse_term(text) for text in include]
+    if not any(term.team == "ally" for term in include_terms):
+        raise ValueError("At least one included term must be an ally pick or ban")
+    return include_terms, [parse_term(text) for text in exclude or []]
+
+
+class _TournamentBitmaps:
+    """Slot metadata and per-(hero, action) bitmaps for one tournament."""
+
+    def __init__(self, db: Session, tournament_id: int, stage_code):
+        matches = db.execute(
+            select(models.Match.id, models.Match.stage_type, models.Match.team1_id, models.Match.team2_id)
+            .where(models.Match.tournament_id == tournament_id)
+            .where(models.Match.winner_id != None)
+            .order_by(models.Match.id)
+        ).all()
+        rows = db.execute(
+            select(
+                models.MatchHero.match_id, models.MatchHero.game_number, models.MatchHero.hero_id,
+                models.MatchHero.team_id, models.MatchHero.type, models.MatchHero.side, models.MatchHero.is_win
+            )
+            .join(models.Match, models.Match.id == models.MatchHero.match_id)
+            .where(models.Match.tournament_id == tournament_id)
+            .where(models.Match.winner_id != None)
+        ).all()
+
+        match_ids = np.array([m.id for m in matches], dtype=np.int64)
+        row_match = np.searchsorted(match_ids, np.array([r.match_id for r in rows], dtype=np.int64))
+        games, row_game = np.unique(row_match * 1000 + np.array([r.game_number for r in rows], dtype=np.int64), return_inverse=True)
+        row_game = row_game.reshape(-1)
+        game_match = games // 1000
+
+        # Slot 2g is team1's view of game g, slot 2g + 1 team2's
+        team1 = np.array([m.team1_id for m in matches], dtype=np.int32)
+        team2 = np.array([m.team2_id for m in matches], dtype=np.int32)
+        row_team = np.array([r.team_id for r in rows], dtype=np.int32)
+        row_slot = 2 * row_game + (row_team != team1[row_match])
+        self.slot_count = 2 * len(games)
+        self.slot_team = np.stack([team1[game_match], team2[game_match]], axis=1).reshape(-1)
+        stages = np.array([stage_code(m.stage_type) for m in matches], dtype=np.int32)
+        self.slot_stage = np.repeat(stages[game_match], 2)
+
+        def bitmap(slots) -> np.ndarray:
+            flags = np.zeros(self.slot_count, dtype=bool)
+            flags[slots] = True
+            return np.packbits(flags)
+
+        is_pick = np.array([r.type == 'pick' for r in rows], dtype=bool)
+        self.valid = bitmap(np.arange(self.slot_count))
+        self.win = bitmap(row_slot[np.array([bool(r.is_win) for r in rows], dtype=bool)])
+        self.sides = {
+            side: bitmap(row_slot[is_pick & np.array([r.side == side for r in rows], dtype=bool)])
+            for side in ("blue", "red")
+        }
+        row_hero = np.array([r.hero_id for r in rows], dtype=np.int32)
+        self.bitmaps: Dict[tuple, np.ndarray] = {}
+        for action, selected in (("pick", is_pick), ("ban", ~is_pick)):
+            heroes, hero_row = np.unique(row_hero[selected], return_inverse=True)
+            flags = np.zeros((len(heroes), self.slot_count), dtype=bool)
+            flags[hero_row.reshape(-1), row_slot[selected]] = True
+            for hero_id, packed in zip(heroes, np.packbits(flags, axis=1)):
+                self.bitmaps[(int(hero_id), action)] = packed
+
+    def term_bitmap(self, hero_id: Optional[int], action: str, team: str) -> Optional[np.ndarray]:
+        """The slots matching a term, or None when no slot does."""
+        ally = self.bitmaps.get((hero_id, action))
+        if ally is None:
+            return None
+        if team == "ally":
+            return ally
+        enemy = _swap_pairs(ally)
+        return enemy if team == "enemy" else ally | enemy
+
+
+class _Snapshot(NamedTuple):
+    """What queries read. Replaced wholesale on sync, never mutated."""
+    tournaments: Dict[int, _TournamentBitmaps]
+    tournament_ids: Dict[str, int]
+    hero_ids: Dict[str, int]
+    team_ids: Dict[str, int]
+
+
+class CompositionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        self._stage_codes: Dict[Optional[str], int] = {}
+        self.snapshot = _Snapshot({}, {}, {}, {})
+
+    def _stage_code(self, stage: Optional[str]) -> int:
+        return self._stage_codes.setdefault(stage, len(self._stage_codes))
+
+    def sync(self, db: Session) -> _Snapshot:
+        """
+        Rebuilds the bitmaps of tournaments whose data_version changed since
+        the last sync. Blocks while another thread syncs, so call it from a
+        worker thread (not from an AsyncSession's run_sync).
+        """
+        with self._lock:
+            tournaments = db.execute(select(models.Tournament.id, models.Tournament.name, models.Tournament.data_version)).all()
+            current = {t.id: t.data_version for t in tournaments}
+            if current == self._versions:
+                return self.snapshot
+            tournament_bitmaps = {t_id: bitmaps for t_id, bitmaps in self.snapshot.tournaments.items() if t_id in current}
+            for t_id, version in current.items():
+                if self._versions.get(t_id) != version:
+                    tournament_bitmaps[t_id] = _TournamentBitmaps(db, t_id, self._stage_code)
+            self.snapshot = _Snapshot(
+                tournament_bitmaps,
+                {t.name: t.id for t in tournaments},
+                {name: h_id for h_id, name in db.execute(select(models.Hero.id, models.Hero.name)).all()},
+                {name: t_id for t_id, name in db.execute(select(models.Team.id, models.Team.name)).all()},
+            )
+            self._versions = current
+            return self.snapshot
+
+    def query(
+        self,
+        db: Session,
+        include: List[Term],
+        exclude: Optional[List[Term]] = None,
+        tournament_names: Optional[List[str]] = None,
+        stage_names: Optional[List[str]] = None,
+        team_names: Optional[List[str]] = None,
+        side: Optional[str] = None,
+    ) -> dict:
+        """
+        Counts the games (from the ally team's point of view) matching every
+        `include` term and no `exclude` term, and how many of them the ally
+        team won. At least one include term must be an ally pick or ban, so
+        each game is counted once. Filters narrow the games by tournament,
+        stage, ally team and ally side.
+        """
+        if not any(term.team == "ally" for term in include):
+            raise ValueError("At least one included term must be an ally pick or ban")
+        snapshot = self.sync(db)
+        tournaments = snapshot.tournaments
+        if tournament_names:
+            wanted = {snapshot.tournament_ids[name] for name in tournament_names if name in snapshot.tournament_ids}
+            tournaments = {t_id: bitmaps for t_id, bitmaps in tournaments.items() if t_id in wanted}
+        stage_codes = [self._stage_codes[s] for s in stage_names or [] if s in self._stage_codes]
+        team_ids = [snapshot.team_ids[name] for name in team_names or [] if name in snapshot.team_ids]
+
+        games = wins = 0
+        for bitmaps in tournaments.values():
+            selected = bitmaps.valid
+            for term in include:
+                matching = bitmaps.term_bitmap(snapshot.hero_ids.get(term.hero), term.action, term.team)
+                if matching is None:
+                    break
+                selected = selected & matching
+            else:
+                for term in exclude or []:
+                    matching = bitmaps.term_bitmap(snapshot.hero_ids.get(term.hero), term.action, term.team)
+                    if matching is not None:
+                        selected = selected & ~matching
+                if stage_names:
+                    selected = selected & np.packbits(np.isin(bitmaps.slot_stage, stage_codes))
+                if team_names:
+                    selected = selected & np.packbits(np.isin(bitmaps.slot_team, team_ids))
+                if side:
+                    selected = selected & bitmaps.sides[side]
+                games += _count(selected)
+                wins += _count(selected & bitmaps.win)
+
+        return {
+            "games": games, "wins": wins, "losses": games - wins,
+            "win_rate": (wins / games * 100) if games > 0 else 0,
+        }
+
+
+_index = None
+
+def get_index() -> CompositionIndex:
+    global _index
+    if _index is None:
+        _index = CompositionIndex()
+    return _index
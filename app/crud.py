@@ -1,232 +1,431 @@
 # In app/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case, select, and_, or_
-from . import models
+import json
+import time
+import hashlib
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, select, insert, update, tuple_, true, and_, or_
+from . import models, rollups
 from typing import Dict, List, Any, Optional
 
-def update_tournament_and_match(db: Session, match_data: dict, region: str, split: str):
+# --- Ingestion ---
+
+def _parse_match_date(value) -> Optional[datetime]:
+    """Liquipedia dates are 'YYYY-MM-DD HH:MM:SS' strings; store them as naive UTC datetimes."""
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _match_team_names(match_data: dict):
+    opponents = match_data.get('match2opponents') or []
+    if len(opponents) < 2:
+        return None, None
+    return opponents[0].get('name'), opponents[1].get('name')
+
+def _match_hero_names(match_data: dict) -> set:
+    """Gathers all unique hero names from picks and bans in the match data."""
+    hero_names = set()
+    for game in match_data.get('match2games', []):
+        if not isinstance(game, dict): continue
+        extradata = game.get('extradata', {})
+        if isinstance(extradata, dict):
+            for i in range(1, 6):
+                for team_num_str in ['1', '2']:
+                    ban_hero = extradata.get(f'team{team_num_str}ban{i}')
+                    if ban_hero: hero_names.add(ban_hero)
+
+        for opp_data in game.get('opponents', []):
+            for p in opp_data.get('players', []):
+                if isinstance(p, dict) and p.get('champion'):
+                    hero_names.add(p['champion'])
+    return hero_names
+
+def _match_hero_actions(match_data: dict, team1_id: int, team2_id: int, hero_ids: Dict[str, int]) -> set:
+    """
+    Turns one match's games into (hero_id, team_id, type, game_number, is_win, side)
+    tuples, one per match_heroes row.
+    """
+    unique_hero_actions = set()
+    for game_index, game in enumerate(match_data.get('match2games', [])):
+        game_num = game_index + 1
+        if not isinstance(game, dict): continue
+
+        game_winner_id = team1_id if game.get('winner') == '1' else team2_id if game.get('winner') == '2' else None
+        extradata = game.get('extradata', {})
+        if not isinstance(extradata, dict): extradata = {}
+        blue_team_id = team1_id if extradata.get('team1side') == 'blue' else team2_id if extradata.get('team2side') == 'blue' else None
+
+        # Bans
+        for i in range(1, 6):
+            for team_num, team_id in [('1', team1_id), ('2', team2_id)]:
+                ban_hero_name = extradata.get(f'team{team_num}ban{i}')
+                if ban_hero_name in hero_ids:
+                    unique_hero_actions.add((hero_ids[ban_hero_name], team_id, 'ban', game_num, None, None))
+
+        # Picks
+        for idx, opp_data in enumerate(game.get('opponents', [])):
+            picking_team_id = team1_id if idx == 0 else team2_id
+            is_win = (picking_team_id == game_winner_id) if game_winner_id else None
+            side = 'blue' if picking_team_id == blue_team_id else 'red'
+
+            for p in opp_data.get('players', []):
+                if isinstance(p, dict) and p.get('champion') in hero_ids:
+                    unique_hero_actions.add((hero_ids[p['champion']], picking_team_id, 'pick', game_num, is_win, side))
+    return unique_hero_actions
+
+def payload_hash(match_data: dict) -> str:
+    """A stable SHA-256 of a match payload: keys sorted, no whitespace."""
+    canonical = json.dumps(match_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _get_or_create_by_name(db: Session, model, names: set) -> Dict[str, int]:
+    """Resolves names to ids with one SELECT, inserting any missing rows in one multi-row INSERT."""
+    if not names:
+        return {}
+    ids = dict(db.execute(select(model.name, model.id).where(model.name.in_(names))).all())
+    missing = [{"name": name} for name in sorted(names - ids.keys())]
+    if missing:
+        ids.update(db.execute(insert(model).returning(model.name, model.id), missing).all())
+    return ids
+
+def _diff_match_heroes(match_id: int, stored: set, desired: set):
+    """
+    Compares stored and desired pick/ban tuples for one match. Rows are keyed
+    like the match_heroes primary key; is_win and side are the updatable values.
+    Returns (insert rows, update rows, primary keys to delete).
+    """
+    stored_by_pk = {action[:4]: action[4:] for action in stored}
+    desired_by_pk = {action[:4]: action[4:] for action in desired}
+
+    inserts, updates = [], []
+    for pk, (is_win, side) in desired_by_pk.items():
+        if pk in stored_by_pk and stored_by_pk[pk] == (is_win, side):
+            continue
+        hero_id, team_id, action_type, game_num = pk
+        row = {"match_id": match_id, "hero_id": hero_id, "team_id": team_id, "type": action_type, "game_number": game_num, "is_win": is_win, "side": side}
+        (updates if pk in stored_by_pk else inserts).append(row)
+
+    deletes = [(match_id, *pk) for pk in stored_by_pk.keys() - desired_by_pk.keys()]
+    return inserts, updates, deletes
+
+def ingest_tournament_matches(db: Session, tournament_name: str, matches: List[dict], region: str, split: str) -> Dict[str, Any]:
     """
-    Creates or updates a tournament and processes the associated match data.
-    (This is the complete, corrected version with hero processing)
+    Creates or updates a tournament and all of the given enriched matches in a
+    single transaction. Matches whose payload hash is already stored are
+    skipped outright. For the rest, teams, heroes and existing matches are each
+    resolved with one query, and matches and pick/ban rows are written with
+    multi-row statements. Only rows whose values actually changed are written.
+    Returns a summary with the ingested match ids, in input order, and the
+    number of pick/ban rows changed per match.
     """
     try:
-        # Step 1: Find or create the tournament
-        tournament_name = match_data.get('tournament', 'Unknown Tournament')
+        # Step 1: Keep only matches with two named teams, and fingerprint each payload
+        valid_matches = []
+        for match_data in matches:
+            team1_name, team2_name = _match_team_names(match_data)
+            if not team1_name or not team2_name: continue
+            match_data['tournament'] = tournament_name # Ensure display name is consistent
+            valid_matches.append((match_data, team1_name, team2_name, payload_hash(match_data)))
+        payload_hashes = [digest for _, _, _, digest in valid_matches]
+
+        # Step 2: Skip every match whose payload is already stored unchanged.
+        # For a finished season this is the only query a refresh makes.
+        known_ids = {}
+        for start in range(0, len(payload_hashes), rollups.LOOKUP_CHUNK):
+            chunk = payload_hashes[start:start + rollups.LOOKUP_CHUNK]
+            known_ids.update(db.execute(select(models.Match.payload_hash, models.Match.id).where(models.Match.payload_hash.in_(chunk))).all())
+        hash_skipped = sum(1 for digest in payload_hashes if digest in known_ids)
+        valid_matches = [match for match in valid_matches if match[3] not in known_ids]
+
+        if not valid_matches:
+            db.rollback() # Ends the read-only transaction; nothing was written
+            return {
+                "tournament": tournament_name, "received": len(matches), "skipped": len(matches) - len(payload_hashes),
+                "inserted": 0, "updated": 0, "unchanged": hash_skipped, "hero_changes": {},
+                "match_ids": [known_ids[digest] for digest in payload_hashes],
+            }
+
+        # Step 3: Find or create the tournament, then resolve teams and heroes
         tournament = db.query(models.Tournament).filter_by(name=tournament_name).first()
         if not tournament:
             tournament = models.Tournament(name=tournament_name, region=region, split=split)
             db.add(tournament)
             db.flush()
-        
-        # Step 2: Find or create the teams
-        team1_name, team2_name = None, None
-        if 'match2opponents' in match_data and len(match_data['match2opponents']) >= 2:
-            team1_name = match_data['match2opponents'][0].get('name')
-            team2_name = match_data['match2opponents'][1].get('name')
 
-        if not team1_name or not team2_name: return None
-
-        team1 = db.query(models.Team).filter_by(name=team1_name).first()
-        if not team1: team1 = models.Team(name=team1_name); db.add(team1)
-        
-        team2 = db.query(models.Team).filter_by(name=team2_name).first()
-        if not team2: team2 = models.Team(name=team2_name); db.add(team2)
-        
-        db.flush()
-
-        # Step 3: Find or create the match
-        match = db.query(models.Match).filter(and_(models.Match.team1_id == team1.id, models.Match.team2_id == team2.id, models.Match.match_date == match_data.get('date'))).first()
-        series_winner = team1 if match_data.get('winner') == '1' else team2 if match_data.get('winner') == '2' else None
-        
-        if not match:
-            match = models.Match(liquipedia_id=match_data.get('pageid', 'N/A'), tournament_id=tournament.id, team1_id=team1.id, team2_id=team2.id, winner_id=series_winner.id if series_winner else None, team1_score=match_data.get('team1score'), team2_score=match_data.get('team2score'), match_date=match_data.get('date'), details=match_data)
-            db.add(match)
-        else:
-            match.winner_id = series_winner.id if series_winner else None; match.team1_score = match_data.get('team1score'); match.team2_score = match_data.get('team2score'); match.details = match_data
-        
-        db.flush()
-
-        # --- THIS IS THE MISSING LOGIC ---
-        # Step 4: Process heroes and game data (picks/bans)
-        
-        # Clear old hero data for this match to prevent duplicates on re-runs
-        db.query(models.MatchHero).filter(models.MatchHero.match_id == match.id).delete(synchronize_session=False)
-
-        # Gather all unique hero names from picks and bans in the match data
-        all_hero_names = set()
-        for game in match_data.get('match2games', []):
-            if not isinstance(game, dict): continue
-            extradata = game.get('extradata', {})
-            if isinstance(extradata, dict):
-                for i in range(1, 6):
-                    for team_num_str in ['1', '2']:
-                        ban_hero = extradata.get(f'team{team_num_str}ban{i}')
-                        if ban_hero: all_hero_names.add(ban_hero)
-            
-            for opp_data in game.get('opponents', []):
-                for p in opp_data.get('players', []):
-                    if isinstance(p, dict) and "champion" in p:
-                        all_hero_names.add(p['champion'])
-        
-        # Ensure all heroes exist in the 'heroes' table, creating them if necessary
-        existing_heroes = {h.name for h in db.query(models.Hero).filter(models.Hero.name.in_(all_hero_names)).all()}
-        for name in all_hero_names:
-            if name not in existing_heroes:
-                db.add(models.Hero(name=name))
-        if all_hero_names - existing_heroes:
-             db.flush()
-
-        hero_map = {h.name: h for h in db.query(models.Hero).filter(models.Hero.name.in_(all_hero_names)).all()}
-
-        # Process each game in the match to save pick/ban data
-        unique_hero_actions = set()
-        for game_index, game in enumerate(match_data.get('match2games', [])):
-            game_num = game_index + 1
-            if not isinstance(game, dict): continue
-            
-            game_winner_team = team1 if game.get('winner') == '1' else team2 if game.get('winner') == '2' else None
-            extradata = game.get('extradata', {})
-            blue_team = team1 if extradata.get('team1side') == 'blue' else team2 if extradata.get('team2side') == 'blue' else None
-            
-            # Bans
-            if isinstance(extradata, dict):
-                for i in range(1, 6):
-                    for team_num, team_obj in [('1', team1), ('2', team2)]:
-                        ban_hero_name = extradata.get(f'team{team_num}ban{i}')
-                        if ban_hero_name in hero_map:
-                            hero_id = hero_map[ban_hero_name].id
-                            unique_hero_actions.add((hero_id, team_obj.id, 'ban', game_num, None, None))
-
-            # Picks
-            for idx, opp_data in enumerate(game.get('opponents', [])):
-                picking_team = team1 if idx == 0 else team2
-                is_win = (picking_team == game_winner_team) if game_winner_team else None
-                side = 'blue' if picking_team == blue_team else 'red'
-                
-                for p in opp_data.get('players', []):
-                    if isinstance(p, dict) and p.get('champion') in hero_map:
-                        hero_id = hero_map[p['champion']].id
-                        unique_hero_actions.add((hero_id, picking_team.id, 'pick', game_num, is_win, side))
-
-        # Add all unique actions to the session
-        for hero_id, team_id, action_type, game_num, is_win_flag, side_flag in unique_hero_actions:
-            db.add(models.MatchHero(match_id=match.id, hero_id=hero_id, team_id=team_id, type=action_type, game_number=game_num, is_win=is_win_flag, side=side_flag))
-        # --- END OF MISSING LOGIC ---
+        team_ids = _get_or_create_by_name(db, models.Team, {name for _, t1, t2, _ in valid_matches for name in (t1, t2)})
+        hero_ids = _get_or_create_by_name(db, models.Hero, set().union(*[_match_hero_names(m) for m, _, _, _ in valid_matches]))
+
+        # Step 4: Look up the matches we already have, keyed like the old per-match lookup
+        rows_by_key, key_by_hash = {}, {}
+        for match_data, team1_name, team2_name, digest in valid_matches:
+            key = (team_ids[team1_name], team_ids[team2_name], _parse_match_date(match_data.get('date')))
+            rows_by_key[key] = (match_data, digest) # A repeated key in one payload: the last one wins, as before
+            key_by_hash[digest] = key
+
+        existing = {}
+        keys = list(rows_by_key)
+        for start in range(0, len(keys), rollups.LOOKUP_CHUNK):
+            chunk = keys[start:start + rollups.LOOKUP_CHUNK]
+            for match in db.query(models.Match).filter(tuple_(models.Match.team1_id, models.Match.team2_id, models.Match.match_date).in_(chunk)).all():
+                existing[(match.team1_id, match.team2_id, match.match_date)] = match
+
+        # Pick/ban rows currently stored for those matches, as (hero, team, type, game, is_win, side)
+        old_actions = defaultdict(set)
+        existing_ids = [match.id for match in existing.values()]
+        for start in range(0, len(existing_ids), rollups.LOOKUP_CHUNK):
+            chunk = existing_ids[start:start + rollups.LOOKUP_CHUNK]
+            for mh in db.query(models.MatchHero).filter(models.MatchHero.match_id.in_(chunk)).all():
+                old_actions[mh.match_id].add((mh.hero_id, mh.team_id, mh.type, mh.game_number, mh.is_win, mh.side))
+
+        # Step 5: Upsert the matches, writing only those whose stored values differ.
+        # What existing matches counted as in the rollups is captured first, since
+        # the bulk UPDATE refreshes the loaded objects.
+        old_state = {
+            match.id: (match.tournament_id, rollups.rollup_stage(match), match.winner_id)
+            for match in existing.values()
+        }
+        inserts, updates, new_keys = [], [], []
+        for key, (match_data, digest) in rows_by_key.items():
+            team1_id, team2_id, match_date = key
+            winner_id = team1_id if match_data.get('winner') == '1' else team2_id if match_data.get('winner') == '2' else None
+            values = {"winner_id": winner_id, "team1_score": match_data.get('team1score'), "team2_score": match_data.get('team2score'), "details": match_data, "payload_hash": digest, "stage_type": match_data.get('stage_type'), "stage_priority": match_data.get('stage_priority')}
+
+            match = existing.get(key)
+            if not match:
+                inserts.append({"liquipedia_id": match_data.get('pageid', 'N/A'), "tournament_id": tournament.id, "team1_id": team1_id, "team2_id": team2_id, "match_date": match_date, **values})
+                new_keys.append(key)
+            elif any(getattr(match, name) != value for name, value in values.items()):
+                updates.append({"id": match.id, **values})
+
+        if updates:
+            db.execute(update(models.Match), updates)
+        match_ids = {key: match.id for key, match in existing.items()}
+        if inserts:
+            new_ids = db.scalars(insert(models.Match).returning(models.Match.id, sort_by_parameter_order=True), inserts).all()
+            match_ids.update(zip(new_keys, new_ids))
+
+        # Step 6: Sync the pick/ban rows by diffing against what is stored
+        rollup_delta = rollups.RollupDelta()
+        row_inserts, row_updates, row_deletes = [], [], []
+        hero_changes = {}
+        for key, (match_data, _) in rows_by_key.items():
+            team1_id, team2_id, match_date = key
+            day = rollups.day_bucket(match_date)
+            match_id = match_ids[key]
+            winner_id = team1_id if match_data.get('winner') == '1' else team2_id if match_data.get('winner') == '2' else None
+            stage = match_data.get('stage_type')
+            actions = _match_hero_actions(match_data, team1_id, team2_id, hero_ids)
+
+            match_inserts, match_updates, match_deletes = _diff_match_heroes(match_id, old_actions.get(match_id, set()), actions)
+            row_inserts += match_inserts; row_updates += match_updates; row_deletes += match_deletes
+            hero_changes[match_id] = len(match_inserts) + len(match_updates) + len(match_deletes)
+
+            # Rollups: a match that changed at all is re-counted as a whole.
+            # Existing matches keep their tournament; new ones belong to this one.
+            if key not in existing:
+                rollup_delta.add_match(tournament.id, stage, team1_id, team2_id, winner_id, actions, day=day)
+                continue
+            old_tournament_id, old_stage, old_winner_id = old_state[match_id]
+            if hero_changes[match_id] or old_winner_id != winner_id or old_stage != stage:
+                rollup_delta.add_match(old_tournament_id, old_stage, team1_id, team2_id, old_winner_id, old_actions.get(match_id, set()), sign=-1, day=day)
+                rollup_delta.add_match(old_tournament_id, stage, team1_id, team2_id, winner_id, actions, day=day)
+
+        pk_columns = tuple_(models.MatchHero.match_id, models.MatchHero.hero_id, models.MatchHero.team_id, models.MatchHero.type, models.MatchHero.game_number)
+        for start in range(0, len(row_deletes), rollups.LOOKUP_CHUNK):
+            db.query(models.MatchHero).filter(pk_columns.in_(row_deletes[start:start + rollups.LOOKUP_CHUNK])).delete(synchronize_session=False)
+        if row_updates:
+            db.execute(update(models.MatchHero), row_updates)
+        if row_inserts:
+            db.execute(insert(models.MatchHero), row_inserts)
+
+        # Step 7: Keep the stat rollups in step and invalidate cached responses
+        updated_ids = {row["id"] for row in updates}
+        changed_existing = {
+            match_id: old_state[match_id][0] for match_id in old_state
+            if match_id in updated_ids or hero_changes[match_id]
+        }
+        rollups.apply_rollup_delta(db, rollup_delta)
+        bump_data_version(db, list(set(changed_existing.values()) | ({tournament.id} if inserts else set())))
 
         db.commit()
-    except Exception as e:
+    except Exception:
         db.rollback(); raise
-    return match
 
-def get_hero_stats(db: Session, tournament_names: Optional[List[str]] = None):
-    matches_query = db.query(models.Match)
-    matches_query = matches_query.filter(models.Match.winner_id != None)
-    if tournament_names:
-        matches_query = matches_query.join(models.Tournament).filter(models.Tournament.name.in_(tournament_names))
-    total_matches = matches_query.count()
-    if total_matches == 0:
-        return {"summary": {}, "heroes": []}
-    filtered_matches_subquery = matches_query.with_entities(models.Match.id).subquery()
-    distinct_games_query = select(models.MatchHero.match_id, models.MatchHero.game_number).filter(models.MatchHero.match_id.in_(select(filtered_matches_subquery))).distinct()
-    total_games = db.execute(select(func.count()).select_from(distinct_games_query.subquery())).scalar_one_or_none() or 0
-    if total_games == 0:
-        return {"summary": {"total_matches": total_matches, "total_games": 0}, "heroes": []}
-
-    results = (
-        db.query(
-            models.Hero.name,
-            func.sum(case((models.MatchHero.type == 'pick', 1), else_=0)).label("picks"),
-            func.sum(case((models.MatchHero.type == 'ban', 1), else_=0)).label("bans"),
-            func.sum(case((models.MatchHero.is_win == True, 1), else_=0)).label("wins"),
-            func.sum(case((models.MatchHero.side == 'blue', 1), else_=0)).label("blue_picks"),
-            func.sum(case(((models.MatchHero.side == 'blue') & (models.MatchHero.is_win == True), 1), else_=0)).label("blue_wins"),
-            func.sum(case((models.MatchHero.side == 'red', 1), else_=0)).label("red_picks"),
-            func.sum(case(((models.MatchHero.side == 'red') & (models.MatchHero.is_win == True), 1), else_=0)).label("red_wins")
+    return {
+        "tournament": tournament_name,
+        "received": len(matches),
+        "skipped": len(matches) - len(payload_hashes),
+        "inserted": len(inserts),
+        "updated": len(changed_existing),
+        "unchanged": len(existing) - len(changed_existing) + hash_skipped,
+        "hero_changes": hero_changes, # match id -> pick/ban rows inserted, updated or deleted
+        "match_ids": [known_ids[digest] if digest in known_ids else match_ids[key_by_hash[digest]] for digest in payload_hashes],
+    }
+
+def update_tournament_and_match(db: Session, match_data: dict, region: str, split: str):
+    """
+    Creates or updates a tournament and processes a single match.
+    Prefer ingest_tournament_matches when there is more than one match to store.
+    Like every write, pass a primary session (SessionLocal), never a replica one.
+    """
+    tournament_name = match_data.get('tournament', 'Unknown Tournament')
+    result = ingest_tournament_matches(db, tournament_name, [match_data], region, split)
+    if not result["match_ids"]:
+        return None
+    return db.get(models.Match, result["match_ids"][0])
+
+def bump_data_version(db: Session, tournament_ids: List[int]):
+    """Marks the tournaments as changed. Call inside the ingesting transaction."""
+    if tournament_ids:
+        db.query(models.Tournament).filter(models.Tournament.id.in_(tournament_ids)).update(
+            {models.Tournament.data_version: models.Tournament.data_version + 1}, synchronize_session=False
         )
-        .join(models.MatchHero, models.Hero.id == models.MatchHero.hero_id)
-        .filter(models.MatchHero.match_id.in_(select(filtered_matches_subquery)))
-        .group_by(models.Hero.name)
-        .all()
-    )
-    
-    hero_stats = []
-    for row in results:
-        hero_name, picks, bans, wins, blue_picks, blue_wins, red_picks, red_wins = row
-        picks, bans, wins, blue_picks, blue_wins, red_picks, red_wins = picks or 0, bans or 0, wins or 0, blue_picks or 0, blue_wins or 0, red_picks or 0, red_wins or 0
-        
-        hero_stats.append({
-            "hero_name": hero_name, "picks": picks, "bans": bans, "wins": wins,
-            "losses": picks - wins,
-            "win_rate": (wins / picks * 100) if picks > 0 else 0,
-            "pick_rate": (picks / total_games * 100) if total_games > 0 else 0,
-            "ban_rate": (bans / total_games * 100) if total_games > 0 else 0,
-            "presence": ((picks + bans) / total_games * 100) if total_games > 0 else 0,
-            "blue_picks": blue_picks, "blue_wins": blue_wins,
-            "red_picks": red_picks, "red_wins": red_wins,
-        })
-    
-    summary = { "total_matches": total_matches, "total_games": total_games, "total_heroes": len(hero_stats), "most_picked": max(hero_stats, key=lambda x: x['picks']) if hero_stats else None, "highest_win_rate": max([h for h in hero_stats if h['picks'] >= 5], key=lambda x: x['win_rate']) if any(h['picks'] >= 5 for h in hero_stats) else None, }
-    return {"summary": summary, "heroes": hero_stats}
+
+def get_data_version(db: Session, tournament_names: Optional[List[str]] = None) -> str:
+    """
+    Returns a fingerprint of the data versions of the given tournaments (or of
+    every tournament when no filter is set). It changes whenever any of them is
+    re-ingested, or when a tournament is added.
+    """
+    query = db.query(models.Tournament.id, models.Tournament.data_version)
+    if tournament_names:
+        query = query.filter(models.Tournament.name.in_(tournament_names))
+    versions = ".".join(f"{t_id}-{version}" for t_id, version in query.order_by(models.Tournament.id).all())
+    return hashlib.sha1(versions.encode()).hexdigest()[:16]
+
+# --- Date Ranges ---
+# date_from/date_to are inclusive days (UTC). Rollups answer them from their
+# day buckets; matches without a date fall outside every range.
+
+def _day_filters(day_column, date_from: Optional[date], date_to: Optional[date]) -> list:
+    filters = []
+    if date_from:
+        filters.append(day_column >= date_from.isoformat())
+    if date_to:
+        filters.append(day_column <= date_to.isoformat())
+        filters.append(day_column != '')
+    return filters
+
+def _match_date_filters(date_from: Optional[date], date_to: Optional[date]) -> list:
+    """The same range on Match.match_date, for queries on raw matches."""
+    filters = []
+    if date_from:
+        filters.append(models.Match.match_date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        filters.append(models.Match.match_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return filters
+
+# --- Team Filter ---
+# As in the original endpoints, team names that match no team are ignored, and
+# when none of them match there is no team filter at all.
+
+def _team_ids(db: Session, team_names: Optional[List[str]]) -> Optional[List[int]]:
+    """IDs of the named teams, or None for no team filter."""
+    if not team_names:
+        return None
+    return db.execute(select(models.Team.id).where(models.Team.name.in_(team_names))).scalars().all() or None
 
 def get_hero_stats(
     db: Session, 
     tournament_names: Optional[List[str]] = None,
     stage_names: Optional[List[str]] = None,
-    team_names: Optional[List[str]] = None
+    team_names: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    debug: bool = False
 ):
     """
-    Calculates comprehensive statistics, with a corrected JSON filter.
+    Calculates comprehensive statistics by summing the pre-aggregated rollup
+    tables, in a single SQL statement. Only matches with a recorded winner are
+    counted (see app/rollups.py). With debug=True the response includes a
+    "debug" section with the SQL execution time.
     """
-    matches_query = db.query(models.Match)
+    HeroRollup = models.HeroStatRollup
+    MatchRollup = models.MatchStatRollup
 
-    # --- THIS IS THE CRITICAL FIX ---
-    # Only consider matches that have a recorded winner.
-    matches_query = matches_query.filter(models.Match.winner_id != None)
-    # --------------------------------
-
-    # Apply user filters
+    hero_filters, match_filters = [], []
     if tournament_names:
-        matches_query = matches_query.join(models.Tournament).filter(models.Tournament.name.in_(tournament_names))
+        tournament_ids = select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))
+        hero_filters.append(HeroRollup.tournament_id.in_(tournament_ids))
+        match_filters.append(MatchRollup.tournament_id.in_(tournament_ids))
     if stage_names:
-        matches_query = matches_query.filter(models.Match.details['stage_type'].as_string().in_(stage_names))
-    if team_names:
-        team_ids_query = db.query(models.Team.id).filter(models.Team.name.in_(team_names))
-        team_ids = [id_tuple[0] for id_tuple in team_ids_query.all()]
-        if team_ids:
-            matches_query = matches_query.filter(
-                (models.Match.team1_id.in_(team_ids)) | (models.Match.team2_id.in_(team_ids))
-            )
-
-    total_matches = matches_query.count()
-    if total_matches == 0:
-        return {"summary": {"total_matches": 0, "total_games": 0, "total_heroes": 0}, "heroes": []}
-
-    # (The rest of the function remains the same as our last correct version)
-    # It correctly uses the filtered matches_query to calculate all stats.
-    filtered_matches_subquery = matches_query.with_entities(models.Match.id).subquery()
-    distinct_games_query = select(models.MatchHero.match_id, models.MatchHero.game_number).filter(models.MatchHero.match_id.in_(select(filtered_matches_subquery))).distinct()
-    total_games = db.execute(select(func.count()).select_from(distinct_games_query.subquery())).scalar_one_or_none() or 0
-    if total_games == 0:
-        return {"summary": {"total_matches": total_matches, "total_games": 0, "total_heroes": 0}, "heroes": []}
-
-    results = (
-        db.query(
+        hero_filters.append(HeroRollup.stage.in_(stage_names))
+        match_filters.append(MatchRollup.stage.in_(stage_names))
+    team_ids = _team_ids(db, team_names)
+    if team_ids:
+        # A match is included when either side is one of the selected teams, so
+        # both teams' picks and bans from that match are counted.
+        hero_filters.append(or_(HeroRollup.team_id.in_(team_ids), HeroRollup.opponent_id.in_(team_ids)))
+        match_filters.append(or_(MatchRollup.team1_id.in_(team_ids), MatchRollup.team2_id.in_(team_ids)))
+    hero_filters += _day_filters(HeroRollup.day, date_from, date_to)
+    match_filters += _day_filters(MatchRollup.day, date_from, date_to)
+
+    # One statement: the match totals and the per-hero sums are CTEs, joined
+    # so every hero row also carries the summary counts. A window count gives
+    # the number of heroes. If nothing matches we still get one all-NULL hero row.
+    match_totals = (
+        select(
+            func.coalesce(func.sum(MatchRollup.matches), 0).label("total_matches"),
+            func.coalesce(func.sum(MatchRollup.games), 0).label("total_games")
+        )
+        .where(*match_filters)
+        .cte("match_totals")
+    )
+    hero_totals = (
+        select(
+            HeroRollup.hero_id,
+            func.sum(HeroRollup.picks).label("picks"),
+            func.sum(HeroRollup.bans).label("bans"),
+            func.sum(HeroRollup.wins).label("wins"),
+            func.sum(case((HeroRollup.side == 'blue', HeroRollup.picks), else_=0)).label("blue_picks"),
+            func.sum(case((HeroRollup.side == 'blue', HeroRollup.wins), else_=0)).label("blue_wins"),
+            func.sum(case((HeroRollup.side == 'red', HeroRollup.picks), else_=0)).label("red_picks"),
+            func.sum(case((HeroRollup.side == 'red', HeroRollup.wins), else_=0)).label("red_wins")
+        )
+        .where(*hero_filters)
+        .group_by(HeroRollup.hero_id)
+        .cte("hero_totals")
+    )
+    statement = (
+        select(
+            match_totals.c.total_matches,
+            match_totals.c.total_games,
+            func.count(models.Hero.id).over().label("total_heroes"),
             models.Hero.name,
-            func.sum(case((models.MatchHero.type == 'pick', 1), else_=0)).label("picks"),
-            func.sum(case((models.MatchHero.type == 'ban', 1), else_=0)).label("bans"),
-            func.sum(case((models.MatchHero.is_win == True, 1), else_=0)).label("wins"),
-            func.sum(case((models.MatchHero.side == 'blue', 1), else_=0)).label("blue_picks"),
-            func.sum(case(((models.MatchHero.side == 'blue') & (models.MatchHero.is_win == True), 1), else_=0)).label("blue_wins"),
-            func.sum(case((models.MatchHero.side == 'red', 1), else_=0)).label("red_picks"),
-            func.sum(case(((models.MatchHero.side == 'red') & (models.MatchHero.is_win == True), 1), else_=0)).label("red_wins")
+            hero_totals.c.picks, hero_totals.c.bans, hero_totals.c.wins,
+            hero_totals.c.blue_picks, hero_totals.c.blue_wins,
+            hero_totals.c.red_picks, hero_totals.c.red_wins
         )
-        .join(models.MatchHero, models.Hero.id == models.MatchHero.hero_id)
-        .filter(models.MatchHero.match_id.in_(select(filtered_matches_subquery)))
-        .group_by(models.Hero.name)
-        .all()
+        .select_from(match_totals)
+        .outerjoin(hero_totals, true())
+        .outerjoin(models.Hero, models.Hero.id == hero_totals.c.hero_id)
+        .order_by(models.Hero.name)
     )
+
+    started = time.perf_counter()
+    rows = db.execute(statement).all()
+    sql_ms = (time.perf_counter() - started) * 1000
+    debug_info = {"sql_ms": round(sql_ms, 3), "statements": 1}
+
+    total_matches, total_games = (rows[0].total_matches, rows[0].total_games) if rows else (0, 0)
+    if total_matches == 0 or total_games == 0:
+        response = {"summary": {"total_matches": total_matches, "total_games": 0, "total_heroes": 0}, "heroes": []}
+        if debug: response["debug"] = debug_info
+        return response
+    results = [
+        (row.name, row.picks, row.bans, row.wins, row.blue_picks, row.blue_wins, row.red_picks, row.red_wins)
+        for row in rows if row.name is not None
+    ]
     
-    # (The processing loop at the end of the function is unchanged, so it is abridged)
     hero_stats = []
     for row in results:
         hero_name, picks, bans, wins, blue_picks, blue_wins, red_picks, red_wins = row
@@ -243,8 +442,10 @@ def get_hero_stats(
             "red_picks": red_picks, "red_wins": red_wins,
         })
     
-    summary = { "total_matches": total_matches, "total_games": total_games, "total_heroes": len(hero_stats), "most_picked": max(hero_stats, key=lambda x: x['picks']) if hero_stats else None, "highest_win_rate": max([h for h in hero_stats if h['picks'] >= 5], key=lambda x: x['win_rate']) if any(h['picks'] >= 5 for h in hero_stats) else None, }
-    return {"summary": summary, "heroes": hero_stats}
+    summary = { "total_matches": total_matches, "total_games": total_games, "total_heroes": rows[0].total_heroes, "most_picked": max(hero_stats, key=lambda x: x['picks']) if hero_stats else None, "highest_win_rate": max([h for h in hero_stats if h['picks'] >= 5], key=lambda x: x['win_rate']) if any(h['picks'] >= 5 for h in hero_stats) else None, }
+    response = {"summary": summary, "heroes": hero_stats}
+    if debug: response["debug"] = debug_info
+    return response
 
 def get_all_tournaments_grouped(db: Session, group_by: str) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -314,41 +515,89 @@ def get_all_teams(
 
 def get_all_stages(db: Session, tournament_names: Optional[List[str]] = None):
     """
-    Retrieves stages. If tournament_names are provided, it returns only the stages
-    that exist within those tournaments. Otherwise, it returns all unique stages.
+    Retrieves stages in priority order (group stages first, playoffs last).
+    If tournament_names are provided, it returns only the stages that exist
+    within those tournaments. Otherwise, it returns all unique stages.
     """
-    query = db.query(models.Match.details['stage_type'].as_string().label("stage"))
+    query = db.query(models.Match.stage_priority, models.Match.stage_type).filter(models.Match.stage_type != None)
     
     if tournament_names:
         query = query.join(models.Tournament).filter(models.Tournament.name.in_(tournament_names))
         
-    distinct_stages = query.distinct().order_by("stage")
-    return [row.stage for row in distinct_stages if row.stage]
+    distinct_stages = query.distinct().order_by(models.Match.stage_priority, models.Match.stage_type)
+    return list(dict.fromkeys(row.stage_type for row in distinct_stages if row.stage_type))
+
+def _get_raw_matchups(db: Session, hero_ids: List[int], filtered_matches_subquery):
+    """Opposing picks faced by each hero, from match_heroes (self-join) rather than the rollup."""
+    HeroPick = models.MatchHero.__table__.alias('hero_pick')
+    OpponentPick = models.MatchHero.__table__.alias('opponent_pick')
+    hero_games = (
+        select(HeroPick.c.hero_id, HeroPick.c.match_id, HeroPick.c.game_number, HeroPick.c.team_id, HeroPick.c.is_win)
+        .where(HeroPick.c.hero_id.in_(hero_ids))
+        .where(HeroPick.c.type == 'pick')
+        .where(HeroPick.c.match_id.in_(select(filtered_matches_subquery)))
+        .subquery()
+    )
+    return (
+        db.query(
+            hero_games.c.hero_id,
+            models.Hero.name,
+            func.count(OpponentPick.c.hero_id).label("games_faced"),
+            func.sum(case((hero_games.c.is_win == True, 1), else_=0)).label("wins_against")
+        )
+        .join(OpponentPick, models.Hero.id == OpponentPick.c.hero_id)
+        .join(
+            hero_games,
+            and_(
+                OpponentPick.c.match_id == hero_games.c.match_id,
+                OpponentPick.c.game_number == hero_games.c.game_number,
+                OpponentPick.c.team_id != hero_games.c.team_id
+            )
+        )
+        .filter(OpponentPick.c.type == 'pick')
+        .group_by(hero_games.c.hero_id, models.Hero.name)
+        .order_by(hero_games.c.hero_id, func.count(OpponentPick.c.hero_id).desc(), models.Hero.name)
+        .all()
+    )
 
 def get_hero_details(
     db: Session,
     hero_name: str,
     tournament_names: Optional[List[str]] = None,
     stage_names: Optional[List[str]] = None,
-    team_names: Optional[List[str]] = None
+    team_names: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
 ):
     """
-    Retrieves detailed statistics for a specific hero. (CORRECTED with team filter fix)
+    Retrieves detailed statistics for a specific hero.
+    """
+    return get_hero_details_batch(db, [hero_name], tournament_names, stage_names, team_names, date_from, date_to)[hero_name]
+
+def get_hero_details_batch(
+    db: Session,
+    hero_names: Optional[List[str]] = None,
+    tournament_names: Optional[List[str]] = None,
+    stage_names: Optional[List[str]] = None,
+    team_names: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """
+    Retrieves detailed statistics for several heroes (every hero if hero_names
+    is None), keyed by hero name. The filtered match set is built once and the
+    by-team and matchup numbers come from one grouped query each.
     """
-    # --- THIS IS THE CRITICAL FIX ---
     # We need to get the team_ids early to use them in two places.
-    team_ids = []
-    if team_names:
-        team_ids_query = db.query(models.Team.id).filter(models.Team.name.in_(team_names))
-        team_ids = [id_tuple[0] for id_tuple in team_ids_query.all()]
-    # --- END OF FIX ---
+    team_ids = _team_ids(db, team_names)
 
     # Base query for filtering matches based on user selection
     matches_query = db.query(models.Match.id).filter(models.Match.winner_id != None)
     if tournament_names:
         matches_query = matches_query.join(models.Tournament).filter(models.Tournament.name.in_(tournament_names))
     if stage_names:
-        matches_query = matches_query.filter(models.Match.details['stage_type'].as_string().in_(stage_names))
+        matches_query = matches_query.filter(models.Match.stage_type.in_(stage_names))
+    matches_query = matches_query.filter(*_match_date_filters(date_from, date_to))
     
     # Filter matches by the selected teams
     if team_ids:
@@ -356,73 +605,311 @@ def get_hero_details(
     
     filtered_matches_subquery = matches_query.subquery()
 
-    hero = db.query(models.Hero).filter(models.Hero.name == hero_name).first()
-    if not hero:
-        return {"by_team": [], "vs_opponents": []}
+    heroes_query = db.query(models.Hero.id, models.Hero.name)
+    if hero_names is not None:
+        heroes_query = heroes_query.filter(models.Hero.name.in_(hero_names))
+    hero_name_by_id = dict(heroes_query.all())
+
+    # Unknown heroes get empty details, like the single-hero endpoint
+    details = {name: {"by_team": [], "vs_opponents": []} for name in (hero_names if hero_names is not None else hero_name_by_id.values())}
+    if not hero_name_by_id:
+        return details
+    hero_ids = list(hero_name_by_id)
 
-    # Query 1: Performance by Team
+    # Query 1: Performance by Team, from the team-keyed hero rollup. A team's
+    # own picks are counted whether the team filter selected it or its opponent.
+    HeroRollup = models.HeroStatRollup
     team_perf_query = (
         db.query(
+            HeroRollup.hero_id,
             models.Team.name,
-            func.count(models.MatchHero.hero_id).label("games_played"),
-            func.sum(case((models.MatchHero.is_win == True, 1), else_=0)).label("wins")
+            func.sum(HeroRollup.picks).label("games_played"),
+            func.sum(HeroRollup.wins).label("wins")
         )
-        .join(models.MatchHero, models.Team.id == models.MatchHero.team_id)
-        .filter(models.MatchHero.match_id.in_(select(filtered_matches_subquery)))
-        .filter(models.MatchHero.hero_id == hero.id)
-        .filter(models.MatchHero.type == 'pick')
+        .join(HeroRollup, models.Team.id == HeroRollup.team_id)
+        .filter(HeroRollup.hero_id.in_(hero_ids))
+        .filter(HeroRollup.picks > 0)
     )
+    if tournament_names:
+        team_perf_query = team_perf_query.filter(HeroRollup.tournament_id.in_(select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))))
+    if stage_names:
+        team_perf_query = team_perf_query.filter(HeroRollup.stage.in_(stage_names))
+    if team_ids:
+        team_perf_query = team_perf_query.filter(HeroRollup.team_id.in_(team_ids))
+    team_perf_query = team_perf_query.filter(*_day_filters(HeroRollup.day, date_from, date_to))
 
-    # --- THIS IS THE CRITICAL FIX ---
-    # Apply the team filter to the final aggregation as well.
+    team_performance_results = (
+        team_perf_query.group_by(HeroRollup.hero_id, models.Team.name)
+        .order_by(HeroRollup.hero_id, func.sum(HeroRollup.picks).desc(), models.Team.name)
+        .all()
+    )
+    for hero_id, name, games, wins in team_performance_results:
+        details[hero_name_by_id[hero_id]]["by_team"].append(
+            {"team_name": name, "games_played": games, "wins": wins, "win_rate": (wins / games * 100) if games > 0 else 0}
+        )
+
+    # Query 2: Performance vs. Opponents
     if team_ids:
-        team_perf_query = team_perf_query.filter(models.Team.id.in_(team_ids))
-    # --- END OF FIX ---
+        # The matchup rollup has no team dimension, so a team filter still needs the raw self-join.
+        matchups = _get_raw_matchups(db, hero_ids, filtered_matches_subquery)
+    else:
+        # Date ranges need the day-bucketed copy of the matchup rollup
+        MatchupRollup = models.HeroMatchupDailyRollup if date_from or date_to else models.HeroMatchupRollup
+        matchups_query = (
+            db.query(
+                MatchupRollup.hero_id,
+                models.Hero.name,
+                func.sum(MatchupRollup.games).label("games_faced"),
+                func.sum(MatchupRollup.wins).label("wins_against")
+            )
+            .join(MatchupRollup, models.Hero.id == MatchupRollup.opponent_hero_id)
+            .filter(MatchupRollup.hero_id.in_(hero_ids))
+        )
+        if tournament_names:
+            matchups_query = matchups_query.filter(MatchupRollup.tournament_id.in_(select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))))
+        if stage_names:
+            matchups_query = matchups_query.filter(MatchupRollup.stage.in_(stage_names))
+        if date_from or date_to:
+            matchups_query = matchups_query.filter(*_day_filters(MatchupRollup.day, date_from, date_to))
+        matchups = (
+            matchups_query.group_by(MatchupRollup.hero_id, models.Hero.name)
+            .order_by(MatchupRollup.hero_id, func.sum(MatchupRollup.games).desc(), models.Hero.name)
+            .all()
+        )
+    for hero_id, name, games, wins in matchups:
+        details[hero_name_by_id[hero_id]]["vs_opponents"].append(
+            {"opponent_hero_name": name, "games_faced": games, "wins_against": wins, "win_rate_vs": (wins / games * 100) if games > 0 else 0}
+        )
 
-    team_performance_results = team_perf_query.group_by(models.Team.name).order_by(func.count(models.MatchHero.hero_id).desc()).all()
+    return details
 
-    by_team_stats = [
-        {"team_name": name, "games_played": games, "wins": wins, "win_rate": (wins / games * 100) if games > 0 else 0}
-        for name, games, wins in team_performance_results
-    ]
+def get_team_stats(
+    db: Session,
+    tournament_names: Optional[List[str]] = None,
+    stage_names: Optional[List[str]] = None,
+    team_names: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    top_heroes: int = 5
+):
+    """
+    Series, game and blue/red side results per team, plus each team's most
+    picked heroes, from the team and hero rollups. Sorted by team name.
+    """
+    TeamRollup = models.TeamStatRollup
+    HeroRollup = models.HeroStatRollup
 
-    # Query 2: Performance vs. Opponents (remains the same)
-    HeroPick = models.MatchHero.__table__.alias('hero_pick')
-    OpponentPick = models.MatchHero.__table__.alias('opponent_pick')
-    hero_games = (
-        select(HeroPick.c.match_id, HeroPick.c.game_number, HeroPick.c.team_id, HeroPick.c.is_win)
-        .where(HeroPick.c.hero_id == hero.id)
-        .where(HeroPick.c.type == 'pick')
-        .where(HeroPick.c.match_id.in_(select(filtered_matches_subquery)))
-        .subquery()
-    )
-    matchups = (
+    team_filters, hero_filters = [], []
+    if tournament_names:
+        tournament_ids = select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))
+        team_filters.append(TeamRollup.tournament_id.in_(tournament_ids))
+        hero_filters.append(HeroRollup.tournament_id.in_(tournament_ids))
+    if stage_names:
+        team_filters.append(TeamRollup.stage.in_(stage_names))
+        hero_filters.append(HeroRollup.stage.in_(stage_names))
+    team_ids = _team_ids(db, team_names)
+    if team_ids:
+        team_filters.append(TeamRollup.team_id.in_(team_ids))
+        hero_filters.append(HeroRollup.team_id.in_(team_ids))
+    team_filters += _day_filters(TeamRollup.day, date_from, date_to)
+    hero_filters += _day_filters(HeroRollup.day, date_from, date_to)
+
+    def side_sum(column, side):
+        return func.sum(case((TeamRollup.side == side, column), else_=0))
+
+    rows = (
         db.query(
-            models.Hero.name,
-            func.count(OpponentPick.c.hero_id).label("games_faced"),
-            func.sum(case((hero_games.c.is_win == True, 1), else_=0)).label("wins_against")
+            TeamRollup.team_id, models.Team.name,
+            func.sum(TeamRollup.matches).label("matches"), func.sum(TeamRollup.match_wins).label("match_wins"),
+            func.sum(TeamRollup.games).label("games"), func.sum(TeamRollup.game_wins).label("game_wins"),
+            side_sum(TeamRollup.games, 'blue').label("blue_games"), side_sum(TeamRollup.game_wins, 'blue').label("blue_wins"),
+            side_sum(TeamRollup.games, 'red').label("red_games"), side_sum(TeamRollup.game_wins, 'red').label("red_wins")
         )
-        .join(OpponentPick, models.Hero.id == OpponentPick.c.hero_id)
-        .join(
-            hero_games,
-            and_(
-                OpponentPick.c.match_id == hero_games.c.match_id,
-                OpponentPick.c.game_number == hero_games.c.game_number,
-                OpponentPick.c.team_id != hero_games.c.team_id
-            )
-        )
-        .filter(OpponentPick.c.type == 'pick')
-        .group_by(models.Hero.name)
-        .order_by(func.count(OpponentPick.c.hero_id).desc())
+        .join(models.Team, models.Team.id == TeamRollup.team_id)
+        .filter(*team_filters)
+        .group_by(TeamRollup.team_id, models.Team.name)
+        .order_by(models.Team.name)
         .all()
     )
-    vs_opponents_stats = [
-        {"opponent_hero_name": name, "games_faced": games, "wins_against": wins, "win_rate_vs": (wins / games * 100) if games > 0 else 0}
-        for name, games, wins in matchups
+
+    most_picked = defaultdict(list)
+    if rows and top_heroes > 0:
+        picks = (
+            db.query(HeroRollup.team_id, models.Hero.name, func.sum(HeroRollup.picks).label("picks"), func.sum(HeroRollup.wins).label("wins"))
+            .join(models.Hero, models.Hero.id == HeroRollup.hero_id)
+            .filter(*hero_filters)
+            .filter(HeroRollup.picks > 0)
+            .group_by(HeroRollup.team_id, models.Hero.name)
+            .order_by(HeroRollup.team_id, func.sum(HeroRollup.picks).desc(), models.Hero.name)
+            .all()
+        )
+        for team_id, hero_name, hero_picks, hero_wins in picks:
+            if len(most_picked[team_id]) < top_heroes:
+                most_picked[team_id].append({"hero_name": hero_name, "picks": hero_picks, "wins": hero_wins, "win_rate": (hero_wins / hero_picks * 100) if hero_picks > 0 else 0})
+
+    def rate(wins, played):
+        return (wins / played * 100) if played > 0 else 0
+
+    return [
+        {
+            "team_name": row.name,
+            "series_played": row.matches, "series_wins": row.match_wins, "series_win_rate": rate(row.match_wins, row.matches),
+            "games_played": row.games, "game_wins": row.game_wins, "game_win_rate": rate(row.game_wins, row.games),
+            "blue_games": row.blue_games, "blue_wins": row.blue_wins, "blue_win_rate": rate(row.blue_wins, row.blue_games),
+            "red_games": row.red_games, "red_wins": row.red_wins, "red_win_rate": rate(row.red_wins, row.red_games),
+            "most_picked": most_picked[row.team_id],
+        }
+        for row in rows
     ]
 
-    return {"by_team": by_team_stats, "vs_opponents": vs_opponents_stats}
+def get_matchup_matrix(
+    db: Session,
+    tournament_names: Optional[List[str]] = None,
+    stage_names: Optional[List[str]] = None
+):
+    """
+    Returns the full hero-vs-hero matrix from the matchup rollup. Row i is the
+    hero, column j the opposing hero; games_faced[i][j] counts games where they
+    were picked against each other and wins[i][j] those won by hero i.
+    """
+    MatchupRollup = models.HeroMatchupRollup
+    Opponent = aliased(models.Hero)
+    query = (
+        db.query(
+            models.Hero.name,
+            Opponent.name,
+            func.sum(MatchupRollup.games),
+            func.sum(MatchupRollup.wins)
+        )
+        .join(MatchupRollup, models.Hero.id == MatchupRollup.hero_id)
+        .join(Opponent, Opponent.id == MatchupRollup.opponent_hero_id)
+    )
+    if tournament_names:
+        query = query.filter(MatchupRollup.tournament_id.in_(select(models.Tournament.id).where(models.Tournament.name.in_(tournament_names))))
+    if stage_names:
+        query = query.filter(MatchupRollup.stage.in_(stage_names))
+    cells = query.group_by(models.Hero.name, Opponent.name).all()
+
+    heroes = sorted({name for hero, opponent, _, _ in cells for name in (hero, opponent)})
+    position = {name: i for i, name in enumerate(heroes)}
+    games_faced = [[0] * len(heroes) for _ in heroes]
+    wins = [[0] * len(heroes) for _ in heroes]
+    for hero, opponent, games, won in cells:
+        games_faced[position[hero]][position[opponent]] = games or 0
+        wins[position[hero]][position[opponent]] = won or 0
+    return {"heroes": heroes, "games_faced": games_faced, "wins": wins}
 
 def get_all_hero_names(db: Session):
     """Retrieves a list of all hero names, sorted alphabetically."""
-    return db.query(models.Hero.name).order_by(models.Hero.name).all()
\ No newline at end of file
+    return db.query(models.Hero.name).order_by(models.Hero.name).all()
+
+# --- Async Read Functions ---
+# The read queries above, for `async def` endpoints. run_sync executes them on
+# the AsyncSession's connection, so the database round trips are awaited
+# instead of holding one of the threadpool's workers.
+
+async def get_data_version_async(db: AsyncSession, tournament_names: Optional[List[str]] = None) -> str:
+    return await db.run_sync(get_data_version, tournament_names)
+
+async def get_hero_stats_async(db: AsyncSession, tournament_names=None, stage_names=None, team_names=None, date_from=None, date_to=None, debug: bool = False):
+    return await db.run_sync(get_hero_stats, tournament_names, stage_names, team_names, date_from, date_to, debug)
+
+async def get_all_tournaments_grouped_async(db: AsyncSession, group_by: str):
+    return await db.run_sync(get_all_tournaments_grouped, group_by)
+
+async def get_all_teams_async(db: AsyncSession, tournament_names=None, hero_name=None):
+    return await db.run_sync(get_all_teams, tournament_names, hero_name)
+
+async def get_all_stages_async(db: AsyncSession, tournament_names=None):
+    return await db.run_sync(get_all_stages, tournament_names)
+
+async def get_team_stats_async(db: AsyncSession, tournament_names=None, stage_names=None, team_names=None, date_from=None, date_to=None):
+    return await db.run_sync(get_team_stats, tournament_names, stage_names, team_names, date_from, date_to)
+
+async def get_matchup_matrix_async(db: AsyncSession, tournament_names=None, stage_names=None):
+    return await db.run_sync(get_matchup_matrix, tournament_names, stage_names)
+
+async def get_all_hero_names_async(db: AsyncSession):
+    return await db.run_sync(get_all_hero_names)
+
+# --- Export ---
+
+def _match_export_statement(tournament_names=None, stage_names=None, team_ids=None, after_id: Optional[int] = None):
+    """
+    One row per pick/ban (or one row for a match without any), ordered by
+    match ID so the rows of a match are adjacent and resuming is a range scan.
+    """
+    Team1, Team2, Winner, PickTeam = (aliased(models.Team) for _ in range(4))
+    MatchHero = models.MatchHero
+    statement = (
+        select(
+            models.Match.id, models.Match.liquipedia_id, models.Tournament.name.label("tournament"),
+            models.Match.stage_type, models.Match.match_date,
+            Team1.name.label("team1"), Team2.name.label("team2"), Winner.name.label("winner"),
+            models.Match.team1_score, models.Match.team2_score,
+            MatchHero.game_number, PickTeam.name.label("pick_team"), models.Hero.name.label("hero"),
+            MatchHero.type, MatchHero.side, MatchHero.is_win
+        )
+        .join(models.Tournament, models.Tournament.id == models.Match.tournament_id)
+        .outerjoin(Team1, Team1.id == models.Match.team1_id)
+        .outerjoin(Team2, Team2.id == models.Match.team2_id)
+        .outerjoin(Winner, Winner.id == models.Match.winner_id)
+        .outerjoin(MatchHero, MatchHero.match_id == models.Match.id)
+        .outerjoin(PickTeam, PickTeam.id == MatchHero.team_id)
+        .outerjoin(models.Hero, models.Hero.id == MatchHero.hero_id)
+        .order_by(models.Match.id, MatchHero.game_number, MatchHero.team_id, MatchHero.type, MatchHero.hero_id)
+    )
+    if after_id is not None:
+        statement = statement.where(models.Match.id > after_id)
+    if tournament_names:
+        statement = statement.where(models.Tournament.name.in_(tournament_names))
+    if stage_names:
+        statement = statement.where(models.Match.stage_type.in_(stage_names))
+    if team_ids:
+        statement = statement.where(or_(models.Match.team1_id.in_(team_ids), models.Match.team2_id.in_(team_ids)))
+    return statement
+
+def _export_match(row) -> Dict[str, Any]:
+    return {
+        "id": row.id, "liquipedia_id": row.liquipedia_id, "tournament": row.tournament, "stage": row.stage_type,
+        "match_date": row.match_date.isoformat() if row.match_date else None,
+        "team1": row.team1, "team2": row.team2, "winner": row.winner,
+        "team1_score": row.team1_score, "team2_score": row.team2_score,
+        "picks_bans": [],
+    }
+
+async def stream_match_export(
+    db: AsyncSession,
+    tournament_names: Optional[List[str]] = None,
+    stage_names: Optional[List[str]] = None,
+    team_names: Optional[List[str]] = None,
+    after_id: Optional[int] = None,
+    chunk_size: int = 1000,
+):
+    """
+    Yields the filtered matches, with their pick/ban rows, as lists of dicts
+    in match ID order. Rows are read through a server-side cursor `chunk_size`
+    at a time, so memory use does not grow with the size of the export. To
+    resume an interrupted export, pass the last match ID received as after_id.
+    """
+    team_ids = await db.run_sync(_team_ids, team_names)
+    statement = _match_export_statement(tournament_names, stage_names, team_ids, after_id)
+    result = await db.stream(statement.execution_options(yield_per=chunk_size))
+    current = None
+    async for partition in result.partitions():
+        chunk = []
+        for row in partition:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    chunk.append(current)
+                current = _export_match(row)
+            if row.type is not None:
+                current["picks_bans"].append({
+                    "game_number": row.game_number, "team": row.pick_team, "hero": row.hero,
+                    "type": row.type, "side": row.side, "is_win": row.is_win,
+                })
+        # The last match of a partition may continue in the next one
+        if chunk:
+            yield chunk
+    if current is not None:
+        yield [current]
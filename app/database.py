@@ -1,7 +1,11 @@
 # In app/database.py
 
 import os
-from sqlalchemy import create_engine
+import time
+import asyncio
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
@@ -18,13 +22,57 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("No DATABASE_URL environment variable set")
 
+# Optional read replica for the API's queries. Ingestion (the Celery worker,
+# seed_db.py, manage.py) always writes through the primary DATABASE_URL.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or DATABASE_URL
+HAS_REPLICA = READ_DATABASE_URL != DATABASE_URL
+
+# The async engines need an async driver. By default it is derived from
+# the sync URL (postgresql -> asyncpg, sqlite -> aiosqlite).
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+# ASYNC_DATABASE_URL / ASYNC_READ_DATABASE_URL override the derived URLs, e.g.
+# to send the async engines through Supabase's session-mode pooler (port
+# 5432) while the sync engines keep the transaction pooler (port 6543).
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_READ_DATABASE_URL") or _async_url(READ_DATABASE_URL)
+
+# Connection pool settings. DB_* apply to the primary, READ_DB_* to the
+# replica (defaulting to the primary's values).
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+READ_DB_POOL_SIZE = int(os.getenv("READ_DB_POOL_SIZE", DB_POOL_SIZE))
+READ_DB_MAX_OVERFLOW = int(os.getenv("READ_DB_MAX_OVERFLOW", DB_MAX_OVERFLOW))
+READ_DB_POOL_PRE_PING = _env_flag("READ_DB_POOL_PRE_PING", str(DB_POOL_PRE_PING))
+
+def _pool_options(url: str, read: bool = False) -> dict:
+    """Pool arguments for create_engine; SQLite's default pools don't take a size."""
+    options = {"pool_pre_ping": READ_DB_POOL_PRE_PING if read else DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        if read:
+            options.update(pool_size=READ_DB_POOL_SIZE, max_overflow=READ_DB_MAX_OVERFLOW)
+        else:
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    return options
+
 # The 'engine' is the core interface to the database
 # It manages the connections and interprets our commands
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
+read_engine = create_engine(READ_DATABASE_URL, **_pool_options(READ_DATABASE_URL, read=True)) if HAS_REPLICA else engine
 
 # A 'Session' is our "window" into the database.
 # We will create a session every time we need to talk to the database.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # --- Dependency to Get DB Session ---
 
@@ -35,4 +83,111 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Async Engines ---
+# Created on first use, so scripts and the Celery worker that only use the
+# sync engine don't need the async driver installed.
+#
+# A transaction-mode pooler (pgbouncer, Supabase's pooler on port 6543) runs
+# each transaction on whichever server connection is free, so asyncpg's
+# cached, named prepared statements break there. For such URLs the statement
+# cache is off and every statement gets a unique name. DB_TRANSACTION_POOLER
+# forces this on or off; by default it is on for port 6543.
+DB_TRANSACTION_POOLER = os.getenv("DB_TRANSACTION_POOLER", "auto").lower()
+
+def _async_connect_args(url: str) -> dict:
+    parsed = make_url(url)
+    if parsed.get_driver_name() != "asyncpg":
+        return {}
+    if DB_TRANSACTION_POOLER == "auto":
+        behind_pooler = parsed.port == 6543
+    else:
+        behind_pooler = DB_TRANSACTION_POOLER in ("1", "true", "yes")
+    if not behind_pooler:
+        return {}
+    from uuid import uuid4
+    return {"statement_cache_size": 0, "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+
+_async_engines = {}
+_async_session_factories = {}
+
+def get_async_engine(read: bool = False):
+    role = "read" if read and HAS_REPLICA else "primary"
+    if role not in _async_engines:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = ASYNC_READ_DATABASE_URL if role == "read" else ASYNC_DATABASE_URL
+        _async_engines[role] = create_async_engine(url, connect_args=_async_connect_args(url), **_pool_options(url, read=role == "read"))
+    return _async_engines[role]
+
+def AsyncSessionLocal(read: bool = False):
+    async_engine = get_async_engine(read)
+    if async_engine not in _async_session_factories:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_session_factories[async_engine] = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factories[async_engine]()
+
+# --- Replica Lag Fallback ---
+# With REPLICA_MAX_LAG_SECONDS set, reads go to the primary while the replica
+# has been missing the primary's latest ingestion for longer than that. Lag is
+# measured on our own data: the replica counts as behind while its tournament
+# data_versions differ from the primary's. Checked at most once per
+# REPLICA_LAG_CHECK_SECONDS.
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS")) if os.getenv("REPLICA_MAX_LAG_SECONDS") else None
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+
+_DATA_VERSIONS = text("SELECT id, data_version FROM tournaments ORDER BY id")
+
+class ReplicaMonitor:
+    def __init__(self, max_lag: Optional[float] = REPLICA_MAX_LAG_SECONDS, check_interval: float = REPLICA_LAG_CHECK_SECONDS):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.behind_since: Optional[float] = None
+        self.checked_at = float("-inf")
+        self.use_primary = False
+
+    async def _data_versions(self, read: bool):
+        async with get_async_engine(read).connect() as conn:
+            return (await conn.execute(_DATA_VERSIONS)).all()
+
+    async def should_use_primary(self) -> bool:
+        if not HAS_REPLICA or self.max_lag is None:
+            return False
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return self.use_primary
+        self.checked_at = now
+        try:
+            primary, replica = await asyncio.gather(self._data_versions(read=False), self._data_versions(read=True))
+        except Exception as e:
+            print(f"Replica lag check failed, reading from the primary: {e}")
+            self.use_primary = True
+            return True
+
+        if primary == replica:
+            self.behind_since = None
+        elif self.behind_since is None:
+            self.behind_since = now
+        self.use_primary = self.behind_since is not None and now - self.behind_since > self.max_lag
+        return self.use_primary
+
+replica_monitor = ReplicaMonitor()
+
+async def get_async_read_db():
+    """
+    Async session for the read endpoints: on the replica when one is
+    configured, unless the lag fallback routes reads to the primary.
+    """
+    read = not await replica_monitor.should_use_primary()
+    async with AsyncSessionLocal(read=read) as db:
+        db.info["read_replica"] = read
+        yield db
+
+def sync_session_like(db):
+    """
+    A sync session on the same database (replica or primary) as an async
+    session from get_async_read_db, for blocking reads run on a thread. Its
+    results then agree with the data_version read through `db`.
+    """
+    return ReadSessionLocal() if db.info.get("read_replica") else SessionLocal()
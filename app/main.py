@@ -1,17 +1,89 @@
 # In app/main.py
-from fastapi import FastAPI, Depends, Query, Path
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, Depends, Query, Path, Request, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from . import models, crud, schemas
-from .database import engine, get_db
-from worker import process_liquipedia_update
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, schemas, metrics, migrations, serialization
+from .cache import cached_response_async
+from .patches import load_patch_windows, resolve_date_range
+from .database import engine, get_async_engine, get_async_read_db, sync_session_like, ReadSessionLocal
 from typing import List, Optional
 
-# This line ensures that the database tables are created based on your models
-# the first time the application starts.
-models.Base.metadata.create_all(bind=engine)
+# --- Startup ---
+# Importing this module doesn't touch the database, Redis or Liquipedia: the
+# Celery client (worker.py) is imported by the endpoints that use it, and the
+# NumPy-backed analytics engine and composition index on first use. Run
+# `python manage.py migrate` on deploy, once; with MIGRATE_ON_STARTUP=true the
+# lifespan hook also applies pending migrations before the first request
+# (concurrent containers are serialized by an advisory lock on Postgres).
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+# ANALYTICS_ENGINE: 'sql' (default) answers from the database, 'memory' from
+# the in-process column store in app/analytics_engine.py. Both return
+# identical results.
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sql").lower()
 
-app = FastAPI()
+def get_analytics_engine():
+    """The in-memory analytics engine when ANALYTICS_ENGINE=memory, else None."""
+    if ANALYTICS_ENGINE != "memory":
+        return None
+    from .analytics_engine import get_engine
+    return get_engine()
+
+async def read_analytics(db: AsyncSession, name: str, **filters):
+    """
+    Runs crud.<name>, or the analytics engine's method of that name with
+    ANALYTICS_ENGINE=memory. The SQL path awaits its queries on `db`. The
+    engine's NumPy work is CPU-bound, so it runs on a worker thread with a sync
+    session on the database `db` reads its data_version from, like the
+    composition index.
+    """
+    analytics = get_analytics_engine()
+    if analytics is None:
+        return await db.run_sync(getattr(crud, name), **filters)
+
+    def query():
+        session = sync_session_like(db)
+        try:
+            return getattr(analytics, name)(session, **filters)
+        finally:
+            session.close()
+
+    return await asyncio.to_thread(query)
+
+def load_analytics_engine():
+    """With ANALYTICS_ENGINE=memory, loads the column store before the first request."""
+    analytics = get_analytics_engine()
+    if analytics is None:
+        return
+    db = ReadSessionLocal()
+    try:
+        analytics.reload(db)
+    finally:
+        db.close()
+
+def prepare_for_requests():
+    """
+    Does the one-off work the first request would otherwise pay for, without
+    connecting to anything: configuring the ORM mappers and loading the
+    async database driver.
+    """
+    configure_mappers()
+    get_async_engine(read=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(migrations.upgrade, engine)
+    await asyncio.to_thread(prepare_for_requests)
+    await asyncio.to_thread(load_analytics_engine)
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Middleware ---
 # This allows your frontend (running on a different address) to make requests
@@ -24,53 +96,107 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics ---
+# Per-endpoint wall time, SQL statement count, SQL time and response size,
+# exported on /metrics. Set SLOW_QUERY_MS to log slow statements.
+metrics.install_sql_hooks()
+app.add_middleware(metrics.MetricsMiddleware)
+
 # --- API Endpoints ---
 
+def date_range_params(
+    date_from: Optional[date] = Query(None, description="First day (UTC) to include"),
+    date_to: Optional[date] = Query(None, description="Last day (UTC) to include"),
+    patch: Optional[str] = Query(None, description="A patch window from /api/patches; combined with date_from/date_to if both are given")
+):
+    """Date filters shared by the stats endpoints, as a (date_from, date_to) pair."""
+    try:
+        return resolve_date_range(date_from, date_to, patch)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown patch {patch!r}")
+
 @app.get("/api/tournaments")
-def get_tournaments_endpoint(
-    db: Session = Depends(get_db),
+async def get_tournaments_endpoint(
+    db: AsyncSession = Depends(get_async_read_db),
     group_by: Optional[str] = Query('split', enum=['split', 'region'])
 ):
     """
     API endpoint to get a list of tournaments, dynamically grouped.
     """
-    return crud.get_all_tournaments_grouped(db, group_by=group_by)
+    return await crud.get_all_tournaments_grouped_async(db, group_by=group_by)
 
 @app.get("/api/teams", response_model=list[schemas.Team])
-def get_teams_endpoint(
-    db: Session = Depends(get_db),
+async def get_teams_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     tournaments: Optional[List[str]] = Query(None),
     hero_name: Optional[str] = Query(None) # <-- ADD THIS PARAMETER
 ):
-    return crud.get_all_teams(
-        db, 
-        tournament_names=tournaments, 
-        hero_name=hero_name # <-- PASS IT TO THE CRUD FUNCTION
+    async def compute():
+        teams = await crud.get_all_teams_async(db, tournament_names=tournaments, hero_name=hero_name)
+        return [schemas.Team.model_validate(team).model_dump() for team in teams]
+    return await cached_response_async(
+        db, "teams", {"tournaments": tournaments, "hero_name": hero_name},
+        compute,
+        tournament_names=tournaments, request=request
     )
 
 @app.get("/api/stages", response_model=list[str])
-def get_stages_endpoint(
-    db: Session = Depends(get_db),
+async def get_stages_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     tournaments: Optional[List[str]] = Query(None) # Add optional filter
 ):
-    return crud.get_all_stages(db, tournament_names=tournaments)
+    return await cached_response_async(
+        db, "stages", {"tournaments": tournaments},
+        lambda: crud.get_all_stages_async(db, tournament_names=tournaments),
+        tournament_names=tournaments, request=request
+    )
+
+@app.get("/api/team-stats", response_model=list[schemas.TeamStats])
+async def get_team_stats_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    tournaments: Optional[List[str]] = Query(None),
+    stages: Optional[List[str]] = Query(None),
+    teams: Optional[List[str]] = Query(None),
+    dates: tuple = Depends(date_range_params)
+):
+    """
+    API endpoint for per-team results: series and game win rates, the
+    blue/red side split and each team's most picked heroes.
+    """
+    date_from, date_to = dates
+    return await cached_response_async(
+        db, "team_stats", {"tournaments": tournaments, "stages": stages, "teams": teams, "date_from": date_from, "date_to": date_to},
+        lambda: crud.get_team_stats_async(db, tournament_names=tournaments, stage_names=stages, team_names=teams, date_from=date_from, date_to=date_to),
+        tournament_names=tournaments, request=request
+    )
 
 @app.get("/api/stats")
-def get_hero_stats_endpoint(
-    db: Session = Depends(get_db),
+async def get_hero_stats_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     tournaments: Optional[List[str]] = Query(None),
     stages: Optional[List[str]] = Query(None),
-    teams: Optional[List[str]] = Query(None)
+    teams: Optional[List[str]] = Query(None),
+    dates: tuple = Depends(date_range_params),
+    debug: bool = Query(False)
 ):
     """
     The main API endpoint to get hero statistics.
-    It accepts optional lists of tournaments, stages, and teams to filter the results.
+    It accepts optional lists of tournaments, stages, and teams to filter the
+    results, and a date range or patch window.
+    With debug=true the response is computed fresh (bypassing the cache) and
+    includes the SQL execution time.
     """
-    return crud.get_hero_stats(
-        db, 
-        tournament_names=tournaments, 
-        stage_names=stages, 
-        team_names=teams
+    date_from, date_to = dates
+    if debug:
+        return await crud.get_hero_stats_async(db, tournament_names=tournaments, stage_names=stages, team_names=teams, date_from=date_from, date_to=date_to, debug=True)
+    return await cached_response_async(
+        db, "stats", {"tournaments": tournaments, "stages": stages, "teams": teams, "date_from": date_from, "date_to": date_to},
+        lambda: read_analytics(db, "get_hero_stats", tournament_names=tournaments, stage_names=stages, team_names=teams, date_from=date_from, date_to=date_to),
+        tournament_names=tournaments, request=request
     )
 
 @app.post("/webhooks/liquipedia")
@@ -93,35 +219,164 @@ async def receive_liquipedia_webhook(payload: schemas.LiquipediaWebhookPayload):
     except Exception:
         tournament_name = "Unknown Tournament"
 
-    # Trigger the Celery task to run in the background.
-    # .delay() is how you send a job to the Celery worker.
-    process_liquipedia_update.delay(payload.page, tournament_name)
-    
-    return {"message": "Webhook received and task queued."}
+    # Trigger the Celery task to run in the background, unless a refresh
+    # for this page is already pending (bursts of edits are coalesced).
+    # Importing the worker and talking to Redis block, so both run on a thread.
+    def schedule():
+        from worker import schedule_refresh
+        return schedule_refresh(payload.page, tournament_name)
+
+    if await asyncio.to_thread(schedule):
+        return {"message": "Webhook received and task queued."}
+    return {"message": "Webhook received; a refresh is already pending."}
+
+@app.get("/api/refresh-stats")
+def get_refresh_stats_endpoint():
+    """Counters for received and coalesced webhooks and executed refreshes."""
+    from worker import get_refresh_counters
+    return get_refresh_counters()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics_endpoint():
+    """Prometheus scrape endpoint: request histograms plus the worker's refresh phase timings."""
+    body = metrics.render_request_metrics()
+    try:
+        from worker import get_phase_timings, REFRESH_PHASE_BUCKETS
+        phases = {(phase,): timing for phase, timing in get_phase_timings().items()}
+        body += "\n".join(metrics.render_histogram(
+            "refresh_phase_duration_seconds", "Celery refresh time per phase (fetch, enrich, write).",
+            ("phase",), REFRESH_PHASE_BUCKETS, phases
+        )) + "\n"
+    except Exception as e:
+        print(f"Could not read refresh phase timings: {e}")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 @app.get("/api/heroes/{hero_name}", response_model=schemas.HeroDetails)
-def get_hero_details_endpoint(
+async def get_hero_details_endpoint(
+    request: Request,
     hero_name: str = Path(..., title="The name of the hero to retrieve details for"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     tournaments: Optional[List[str]] = Query(None),
     stages: Optional[List[str]] = Query(None),
-    teams: Optional[List[str]] = Query(None)
+    teams: Optional[List[str]] = Query(None),
+    dates: tuple = Depends(date_range_params)
 ):
     """
     API endpoint to get detailed statistics for a single hero, including
     performance by team and matchups against other heroes.
     """
-    return crud.get_hero_details(
-        db, 
-        hero_name=hero_name,
-        tournament_names=tournaments, 
-        stage_names=stages, 
-        team_names=teams
+    date_from, date_to = dates
+    return await cached_response_async(
+        db, "hero_details", {"hero_name": hero_name, "tournaments": tournaments, "stages": stages, "teams": teams, "date_from": date_from, "date_to": date_to},
+        lambda: read_analytics(db, "get_hero_details", hero_name=hero_name, tournament_names=tournaments, stage_names=stages, team_names=teams, date_from=date_from, date_to=date_to),
+        tournament_names=tournaments, request=request
     )
 
+@app.get("/api/hero-details", response_model=dict[str, schemas.HeroDetails])
+async def get_hero_details_batch_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    heroes: List[str] = Query(..., description='Hero names, or "all" for every hero'),
+    tournaments: Optional[List[str]] = Query(None),
+    stages: Optional[List[str]] = Query(None),
+    teams: Optional[List[str]] = Query(None),
+    dates: tuple = Depends(date_range_params)
+):
+    """
+    API endpoint to get the same details as /api/heroes/{hero_name} for many
+    heroes at once, keyed by hero name, with the filters applied once.
+    """
+    date_from, date_to = dates
+    hero_names = None if heroes == ["all"] else heroes
+    return await cached_response_async(
+        db, "hero_details_batch", {"heroes": hero_names or ["all"], "tournaments": tournaments, "stages": stages, "teams": teams, "date_from": date_from, "date_to": date_to},
+        lambda: read_analytics(db, "get_hero_details_batch", hero_names=hero_names, tournament_names=tournaments, stage_names=stages, team_names=teams, date_from=date_from, date_to=date_to),
+        tournament_names=tournaments, request=request
+    )
+
+@app.get("/api/matchups", response_model=schemas.MatchupMatrix)
+async def get_matchup_matrix_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    tournaments: Optional[List[str]] = Query(None),
+    stages: Optional[List[str]] = Query(None)
+):
+    """
+    API endpoint to get the whole hero-vs-hero matchup matrix for a filter set,
+    e.g. for heatmaps, in a single response.
+    """
+    return await cached_response_async(
+        db, "matchups", {"tournaments": tournaments, "stages": stages},
+        lambda: crud.get_matchup_matrix_async(db, tournament_names=tournaments, stage_names=stages),
+        tournament_names=tournaments, request=request
+    )
+
+@app.get("/api/composition", response_model=schemas.CompositionStats)
+async def get_composition_endpoint(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    include: List[str] = Query(..., description="Terms every game must match: Hero[:pick|ban[:ally|enemy|any]], default pick and ally"),
+    exclude: Optional[List[str]] = Query(None, description="Terms no game may match, same format"),
+    tournaments: Optional[List[str]] = Query(None),
+    stages: Optional[List[str]] = Query(None),
+    teams: Optional[List[str]] = Query(None, description="Only count games of these teams (as the ally team)"),
+    side: Optional[str] = Query(None, enum=["blue", "red"])
+):
+    """
+    API endpoint for composition questions, e.g. include=A&include=B for A
+    and B on the same team, include=A&include=B:pick:enemy&include=C:ban:any
+    for A against B with C banned. Answered from the composition bitmap index.
+    """
+    from .composition_index import get_index as get_composition_index, parse_terms
+    try:
+        include_terms, exclude_terms = parse_terms(include, exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def query():
+        # The index blocks while it rebuilds, so it runs on a worker thread with
+        # its own session, on the database `db` reads its data_version from
+        session = sync_session_like(db)
+        try:
+            return get_composition_index().query(session, include_terms, exclude_terms, tournaments, stages, teams, side)
+        finally:
+            session.close()
+
+    return await cached_response_async(
+        db, "composition", {
+            "include": [":".join(term) for term in include_terms], "exclude": [":".join(term) for term in exclude_terms],
+            "tournaments": tournaments, "stages": stages, "teams": teams, "side": side
+        },
+        lambda: asyncio.to_thread(query),
+        tournament_names=tournaments, request=request
+    )
+
+@app.get("/api/export/matches")
+async def export_matches_endpoint(
+    db: AsyncSession = Depends(get_async_read_db),
+    tournaments: Optional[List[str]] = Query(None),
+    stages: Optional[List[str]] = Query(None),
+    teams: Optional[List[str]] = Query(None),
+    after_id: Optional[int] = Query(None, description="Resume after this match ID (the last `id` received)")
+):
+    """
+    Streams matches with their pick/ban rows as NDJSON, one match per line,
+    in match ID order, for bulk analysis outside the API.
+    """
+    async def lines():
+        async for chunk in crud.stream_match_export(db, tournament_names=tournaments, stage_names=stages, team_names=teams, after_id=after_id):
+            yield serialization.dumps_lines(chunk)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/patches")
+def get_patches_endpoint():
+    """The patch windows configured in patches.json, newest first."""
+    windows = sorted(load_patch_windows().items(), key=lambda item: item[1][0], reverse=True)
+    return [{"name": name, "start": start, "end": end} for name, (start, end) in windows]
+
 @app.get("/api/heroes", response_model=list[str])
-def get_all_heroes_endpoint(db: Session = Depends(get_db)):
+async def get_all_heroes_endpoint(db: AsyncSession = Depends(get_async_read_db)):
     """API endpoint to get a list of all hero names for navigation."""
-    results = crud.get_all_hero_names(db)
+    results = await crud.get_all_hero_names_async(db)
     # The query returns tuples, so we extract the first element of each
     return [item[0] for item in results]
\ No newline at end of file
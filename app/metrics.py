@@ -0,0 +1,169 @@
+# In app/metrics.py
+
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# SLOW_QUERY_MS: log SQL statements slower than this many milliseconds,
+# with the endpoint and filters that caused them. Unset disables the log.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# --- Histograms ---
+
+def render_histogram(name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float], series: Dict[tuple, Tuple[List[int], float, int]]) -> List[str]:
+    """
+    Renders one histogram in the Prometheus text format. `series` maps label
+    values to (cumulative bucket counts, sum, count).
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, (bucket_counts, total, count) in sorted(series.items()):
+        label_text = ",".join(f'{key}="{value}"' for key, value in zip(labelnames, labels))
+        prefix = label_text + "," if label_text else ""
+        braces = f"{{{label_text}}}" if label_text else ""
+        for bound, bucket_count in zip(buckets, bucket_counts):
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{braces} {total}")
+        lines.append(f"{name}_count{braces} {count}")
+    return lines
+
+
+class Histogram:
+    """An in-process Prometheus histogram, one series per label combination."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ("method", "endpoint")):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for i in range(bisect.bisect_left(self.buckets, value), len(self.buckets)):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        return render_histogram(self.name, self.help_text, self.labelnames, self.buckets, series)
+
+
+REQUEST_SECONDS = Histogram("api_request_duration_seconds", "Wall time per request.", SECONDS_BUCKETS)
+REQUEST_STATEMENTS = Histogram("api_request_sql_statements", "SQL statements executed per request.", STATEMENT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("api_request_db_seconds", "Time spent executing SQL per request.", SECONDS_BUCKETS)
+REQUEST_RESPONSE_BYTES = Histogram("api_response_size_bytes", "Response body size per request.", SIZE_BUCKETS)
+REQUEST_HISTOGRAMS = (REQUEST_SECONDS, REQUEST_STATEMENTS, REQUEST_DB_SECONDS, REQUEST_RESPONSE_BYTES)
+
+def render_request_metrics() -> str:
+    return "\n".join(line for histogram in REQUEST_HISTOGRAMS for line in histogram.render()) + "\n"
+
+# --- Per-Request SQL Accounting ---
+
+class RequestStats:
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.filters = parse_qs(scope.get("query_string", b"").decode())
+        self.statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def endpoint(self) -> str:
+        # The router stores the matched route in the scope before calling the endpoint
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+_current_request: "contextvars.ContextVar[Optional[RequestStats]]" = contextvars.ContextVar("request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((context, time.perf_counter()))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()[1]
+    stats = _current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+        print(json.dumps({
+            "slow_query_ms": round(elapsed * 1000, 1),
+            "endpoint": stats.endpoint if stats else None,
+            "filters": stats.filters if stats else None,
+            "statement": " ".join(statement.split()),
+            "parameters": repr(parameters)[:500],
+        }))
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its entry,
+    # if it got as far as before_cursor_execute, so the stack doesn't grow
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts and context.execution_context is not None and starts[-1][0] is context.execution_context:
+        starts.pop()
+
+_hooks_installed = False
+
+def install_sql_hooks():
+    """Times every statement on every engine, including the async engines' sync cores."""
+    global _hooks_installed
+    if not _hooks_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _hooks_installed = True
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording wall time, SQL statement count, SQL time and
+    response size per endpoint. Endpoints are labelled by route template
+    (e.g. /api/heroes/{hero_name}) to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        response_bytes = 0
+
+        async def send_and_count(message):
+            nonlocal response_bytes
+            if message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            _current_request.reset(token)
+            labels = (scope["method"], stats.endpoint)
+            REQUEST_SECONDS.observe(labels, time.perf_counter() - start)
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            REQUEST_DB_SECONDS.observe(labels, stats.db_seconds)
+            REQUEST_RESPONSE_BYTES.observe(labels, response_bytes)
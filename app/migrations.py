@@ -0,0 +1,145 @@
+# In app/migrations.py
+
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from . import models, rollups
+from .processing import liquipedia_api
+
+# --- Versioned Schema Migrations ---
+# Each migration runs once, in order, in its own transaction, and is then
+# recorded in schema_migrations. Apply them with `python manage.py migrate`
+# on deploy (or set MIGRATE_ON_STARTUP=true to have the API apply pending ones
+# at startup).
+#
+# Migration 1 builds the schema from the models, so a new database gets every
+# table in one go. Later migrations must therefore be idempotent: on a new
+# database the models have already created what they add.
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# Indexes added by migration 2 (the rest of migration 1's job predates versioning)
+QUERY_PATH_INDEXES = (
+    "ix_matches_teams_date", "ix_matches_team2", "ix_matches_tournament_stage", "ix_matches_completed_tournament", "ix_matches_winner",
+    "ix_match_heroes_hero_type", "ix_match_heroes_team_hero",
+)
+
+def _create_indexes(conn: Connection, names: set):
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in names and index.name not in existing:
+                index.create(conn)
+                print(f"Created index {index.name}")
+
+def _create_tables_and_columns(conn: Connection):
+    """
+    Creates missing tables, then adds the columns and indexes that were
+    introduced after a table was first created (create_all never alters
+    existing tables). This is what `manage.py upgrade-schema` used to do.
+    """
+    models.Base.metadata.create_all(bind=conn)
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+            print(f"Added column {table.name}.{column.name}")
+    model_indexes = {index.name for table in models.Base.metadata.sorted_tables for index in table.indexes}
+    _create_indexes(conn, model_indexes - set(QUERY_PATH_INDEXES))
+
+def backfill_match_stages(db: Session) -> int:
+    """
+    Fills Match.stage_type and stage_priority for rows stored before they were
+    columns, from the enriched payload (or recomputed from pagename/section).
+    No commit; returns how many matches were filled. Run it before rebuilding
+    the rollups, which are keyed on the stage.
+    """
+    pending = db.query(models.Match).filter(models.Match.stage_type == None)
+    updates = []
+    for match in pending.yield_per(1000):
+        details = match.details or {}
+        stage_type, stage_priority = details.get('stage_type'), details.get('stage_priority')
+        if stage_type is None:
+            stage_type, stage_priority = liquipedia_api._get_stage_info(details.get('pagename', ''), details.get('section', ''))
+        updates.append({"id": match.id, "stage_type": stage_type, "stage_priority": stage_priority})
+
+    for start in range(0, len(updates), 1000):
+        db.execute(update(models.Match), updates[start:start + 1000])
+    return len(updates)
+
+def _create_team_rollups(conn: Connection):
+    models.TeamStatRollup.__table__.create(conn, checkfirst=True)
+    # The session joins the migration's transaction; upgrade() commits it
+    with Session(bind=conn) as db:
+        backfill_match_stages(db)
+        rollups.rebuild_team_rollups(db)
+
+# Rollups whose primary key gained the day column
+DAY_BUCKETED_ROLLUPS = (models.HeroStatRollup, models.MatchStatRollup, models.TeamStatRollup, models.HeroMatchupDailyRollup)
+
+def _bucket_rollups_by_day(conn: Connection):
+    """Recreates the rollups keyed by day (a primary key can't be altered in place) and refills them."""
+    for model in DAY_BUCKETED_ROLLUPS:
+        model.__table__.drop(conn, checkfirst=True)
+        model.__table__.create(conn)
+    with Session(bind=conn) as db:
+        backfill_match_stages(db)
+        rollups.rebuild_rollups(db, commit=False)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Create tables, add post-release columns", _create_tables_and_columns),
+    (2, "Query-path indexes on matches and match_heroes", lambda conn: _create_indexes(conn, set(QUERY_PATH_INDEXES))),
+    (3, "Team stat rollups", _create_team_rollups),
+    (4, "Daily rollup buckets", _bucket_rollups_by_day),
+]
+
+# Several API containers may start at once. On Postgres each migration's
+# transaction first takes this advisory lock and re-checks schema_migrations,
+# so a migration runs exactly once. The lock is transaction-scoped, which also
+# holds through a transaction-mode pooler (pgbouncer), unlike pg_advisory_lock.
+MIGRATION_LOCK_KEY = 7_318_102_611
+
+def _lock_migrations(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def _applied(conn: Connection) -> set:
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def applied_versions(engine: Engine) -> set:
+    with engine.begin() as conn:
+        _lock_migrations(conn)
+        schema_migrations.create(conn, checkfirst=True)
+        return _applied(conn)
+
+def pending_migrations(engine: Engine):
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+def upgrade(engine: Engine) -> int:
+    """Applies every pending migration. Returns how many ran."""
+    applied = 0
+    for version, name, migrate in pending_migrations(engine):
+        with engine.begin() as conn:
+            _lock_migrations(conn)
+            if version in _applied(conn):
+                continue # Applied by a concurrent upgrade while we waited
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+        print(f"Applied migration {version}: {name}")
+        applied += 1
+    return applied
@@ -7,7 +7,9 @@ from sqlalchemy import (
     ForeignKey,
     DateTime,
     JSON,
-    Boolean
+    Boolean,
+    Index,
+    text
 )
 from sqlalchemy.orm import relationship, declarative_base
 
@@ -27,6 +29,10 @@ class Tournament(Base):
     split = Column(String, index=True) 
     # --- NEW COLUMNS END ---
 
+    # Bumped every time ingestion commits changes for this tournament.
+    # Response caches key on it, so a bump invalidates their entries.
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+
     matches = relationship("Match", back_populates="tournament")
 
 class Team(Base):
@@ -58,6 +64,13 @@ class Match(Base):
     
     # Store the original full JSON payload from the API for future analysis.
     details = Column(JSON) 
+    # SHA-256 of the canonicalized payload, so unchanged matches can be skipped on refresh.
+    payload_hash = Column(String(64), index=True)
+
+    # Stage info computed by LiquipediaAPI._get_stage_info during enrichment.
+    # Stored as columns (not just inside details) so filters can use an index.
+    stage_type = Column(String, index=True)
+    stage_priority = Column(Integer)
     
     # --- Relationships ---
     # These link the match back to its related objects.
@@ -69,6 +82,25 @@ class Match(Base):
     # This links a match to all its associated pick/ban records.
     heroes = relationship("MatchHero", back_populates="match", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Lets /api/stages list stages in priority order straight from the index.
+        Index("ix_matches_stage_order", "stage_priority", "stage_type"),
+        # Ingestion looks matches up by (team1, team2, date). Team filters
+        # (team1_id OR team2_id) combine this with ix_matches_team2; a partial
+        # team2 index would stop SQLite from using either for the OR.
+        Index("ix_matches_teams_date", "team1_id", "team2_id", "match_date"),
+        Index("ix_matches_team2", "team2_id"),
+        # /api/stages for a tournament
+        Index("ix_matches_tournament_stage", "tournament_id", "stage_priority", "stage_type"),
+        # The filtered match set behind hero details: completed matches by
+        # tournament and stage, answered from the index alone
+        Index(
+            "ix_matches_completed_tournament", "tournament_id", "stage_type", "id",
+            postgresql_where=text("winner_id IS NOT NULL"), sqlite_where=text("winner_id IS NOT NULL")
+        ),
+        Index("ix_matches_winner", "winner_id"),
+    )
+
 
 # In app/models.py
 
@@ -90,4 +122,104 @@ class MatchHero(Base):
 
     match = relationship("Match", back_populates="heroes")
     hero = relationship("Hero")
-    team = relationship("Team")
\ No newline at end of file
+    team = relationship("Team")
+
+    __table_args__ = (
+        # A hero's picks (or bans), with what hero details need to skip the table
+        Index("ix_match_heroes_hero_type", "hero_id", "type", "match_id", "team_id", "game_number", "is_win"),
+        # A team's picks and bans
+        Index("ix_match_heroes_team_hero", "team_id", "hero_id"),
+    )
+
+# --- Rollup Tables ---
+# These hold pre-aggregated counters so the stats endpoints never have to scan
+# match_heroes. They are maintained incrementally by crud at ingestion time and
+# can be rebuilt from scratch with `python manage.py rebuild-rollups`.
+# Only matches with a recorded winner are counted.
+#
+# Most rollups are also bucketed by day (the match date, UTC, as YYYY-MM-DD;
+# '' if unknown) so date-range queries sum buckets instead of matches. A
+# pairing of teams in a stage spans few days, so this adds few rows.
+
+class HeroStatRollup(Base):
+    __tablename__ = "hero_stat_rollups"
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    stage = Column(String, primary_key=True) # Match.stage_type, '' if unknown
+    team_id = Column(Integer, ForeignKey("teams.id"), primary_key=True) # Team that picked/banned
+    opponent_id = Column(Integer, ForeignKey("teams.id"), primary_key=True) # The other team in the match
+    hero_id = Column(Integer, ForeignKey("heroes.id"), primary_key=True)
+    side = Column(String, primary_key=True) # 'blue', 'red', or '' for bans
+    day = Column(String(10), primary_key=True, default='', server_default='')
+
+    picks = Column(Integer, nullable=False, default=0)
+    bans = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Hero details' by-team section (one hero, optionally a date range)
+        Index("ix_hero_stat_rollups_hero_day", "hero_id", "day"),
+        Index("ix_hero_stat_rollups_day", "day"),
+    )
+
+class MatchStatRollup(Base):
+    __tablename__ = "match_stat_rollups"
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    team1_id = Column(Integer, ForeignKey("teams.id"), primary_key=True)
+    team2_id = Column(Integer, ForeignKey("teams.id"), primary_key=True)
+    day = Column(String(10), primary_key=True, default='', server_default='')
+
+    matches = Column(Integer, nullable=False, default=0)
+    games = Column(Integer, nullable=False, default=0) # Distinct games with pick/ban data
+
+    __table_args__ = (Index("ix_match_stat_rollups_day", "day"),)
+
+
+# Series and game results per team. Series counters are on the side '' row
+# (a series has no side); games are counted on the side the team played them.
+class TeamStatRollup(Base):
+    __tablename__ = "team_stat_rollups"
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    team_id = Column(Integer, ForeignKey("teams.id"), primary_key=True)
+    side = Column(String, primary_key=True) # 'blue', 'red', or '' (series, or games without side data)
+    day = Column(String(10), primary_key=True, default='', server_default='')
+
+    matches = Column(Integer, nullable=False, default=0)
+    match_wins = Column(Integer, nullable=False, default=0)
+    games = Column(Integer, nullable=False, default=0)
+    game_wins = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_team_stat_rollups_day", "day"),)
+
+
+# How often a picked hero faced an opposing pick in the same game, and won.
+class HeroMatchupRollup(Base):
+    __tablename__ = "hero_matchup_rollups"
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    hero_id = Column(Integer, ForeignKey("heroes.id"), primary_key=True)
+    opponent_hero_id = Column(Integer, ForeignKey("heroes.id"), primary_key=True)
+
+    games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0) # Games hero_id's team won
+
+
+# The matchup rollup by day, for date-range queries. Kept separately because
+# hero pairs recur on most days: bucketing hero_matchup_rollups itself would
+# multiply the rows that undated queries (e.g. the matchup matrix) sum.
+class HeroMatchupDailyRollup(Base):
+    __tablename__ = "hero_matchup_daily_rollups"
+    day = Column(String(10), primary_key=True)
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    hero_id = Column(Integer, ForeignKey("heroes.id"), primary_key=True)
+    opponent_hero_id = Column(Integer, ForeignKey("heroes.id"), primary_key=True)
+
+    games = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # One hero's matchups over a date range
+        Index("ix_hero_matchup_daily_hero_day", "hero_id", "day"),
+    )
@@ -0,0 +1,51 @@
+# In app/patches.py
+
+import os
+import json
+from datetime import date
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Patch Windows ---
+# Named date ranges (game patches) that stats can be filtered by, configured
+# in patches.json next to tournaments.json:
+#
+#   [{"name": "1.9.20", "start": "2025-01-07", "end": "2025-01-27"}, ...]
+#
+# "end" (inclusive) may be left out for the current patch. The file is read
+# again when it changes, so new windows apply without a restart.
+PATCHES_FILE = os.getenv("PATCHES_FILE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "patches.json"))
+
+_loaded: Tuple[Optional[float], Dict[str, Tuple[date, Optional[date]]]] = (None, {})
+
+def load_patch_windows() -> Dict[str, Tuple[date, Optional[date]]]:
+    """Returns {patch name: (start, end or None)} from PATCHES_FILE ({} if there is none)."""
+    global _loaded
+    try:
+        mtime = os.path.getmtime(PATCHES_FILE)
+    except OSError:
+        return {}
+    if _loaded[0] != mtime:
+        with open(PATCHES_FILE) as f:
+            entries = json.load(f)
+        windows = {
+            entry["name"]: (date.fromisoformat(entry["start"]), date.fromisoformat(entry["end"]) if entry.get("end") else None)
+            for entry in entries
+        }
+        _loaded = (mtime, windows)
+    return _loaded[1]
+
+def resolve_date_range(date_from: Optional[date], date_to: Optional[date], patch: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Narrows date_from/date_to to a patch window when one is named (the
+    intersection of both). Raises KeyError for an unknown patch.
+    """
+    if not patch:
+        return date_from, date_to
+    start, end = load_patch_windows()[patch]
+    date_from = max(date_from, start) if date_from else start
+    if end:
+        date_to = min(date_to, end) if date_to else end
+    return date_from, date_to
@@ -1,39 +1,76 @@
 # In app/processing.py
 
 import os
-import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- CONSTANTS ---
 BASE_PARAMS = {"wiki": "mobilelegends", "limit": 500}
+# Overridable so seeding can be pointed at a local fake server.
+LIQUIPEDIA_API_URL = os.getenv("LIQUIPEDIA_API_URL", "https://api.liquipedia.net/api/v3").rstrip("/")
+REQUEST_TIMEOUT = 30 # seconds
 TEAM_NORMALIZATION = { "AP.Bren": "Falcons AP.Bren", "ECHO": "Team Liquid PH" }
 
 # --- API FETCHING & PROCESSING LOGIC ---
 class LiquipediaAPI:
-    def get_tournament_matches(self, tournament_path: str):
+    def get_tournament_matches(self, tournament_path: str, snapshots=None):
+        """
+        Fetches and enriches a tournament's matches. When a SnapshotStore is
+        given, the raw responses are also recorded for offline replay.
+        """
         try:
-            api_key = os.getenv("LIQUIPEDIA_API_KEY")
-            if not api_key:
-                print("Error: LIQUIPEDIA_API_KEY not found.")
-                return []
-            
-            headers = {"Authorization": f"Apikey {api_key}", "User-Agent": "MLBB-Analytics-Seeder/1.0"}
-            params = BASE_PARAMS.copy()
-            params['conditions'] = f"[[parent::{tournament_path}]]"
-            url = "https://api.liquipedia.net/api/v3/match"
-            
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            
-            raw_matches = resp.json().get("result", [])
+            raw_matches = self.fetch_raw_matches(tournament_path, snapshots=snapshots)
             return self._enrich_matches(raw_matches)
 
         except Exception as e:
             print(f"API Error for path {tournament_path}: {e}")
             return []
 
+    def fetch_raw_matches(self, tournament_path: str, snapshots=None) -> list:
+        """
+        Fetches every match of a tournament, paging with offsets until the API
+        returns a short (or empty) page. Raises on HTTP or configuration errors.
+        """
+        # Imported here so the API and manage.py, which only use the enrichment
+        # helpers, don't load the HTTP client
+        import requests
+
+        api_key = os.getenv("LIQUIPEDIA_API_KEY")
+        if not api_key:
+            raise RuntimeError("LIQUIPEDIA_API_KEY not found.")
+
+        headers = {"Authorization": f"Apikey {api_key}", "User-Agent": "MLBB-Analytics-Seeder/1.0"}
+        url = f"{LIQUIPEDIA_API_URL}/match"
+
+        raw_matches, raw_pages = [], []
+        offset = 0
+        while True:
+            params = BASE_PARAMS.copy()
+            params['conditions'] = f"[[parent::{tournament_path}]]"
+            params['offset'] = offset
+
+            resp = requests.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+            resp.raise_for_status()
+
+            raw_pages.append(resp.content)
+            page = resp.json().get("result", [])
+            raw_matches.extend(page)
+            if len(page) < params['limit']:
+                break
+            offset += len(page)
+
+        if snapshots is not None:
+            snapshots.record(tournament_path, raw_pages)
+        return raw_matches
+
+    def replay_tournament_matches(self, tournament_path: str, snapshots) -> list:
+        """Enriches the most recently recorded snapshot of a tournament, without any network access."""
+        entry = snapshots.latest(tournament_path)
+        if entry is None:
+            return []
+        return self._enrich_matches(snapshots.load_matches(entry))
+
     def _normalize_team(self, team_name: str) -> str:
         stripped_name = (team_name or "").strip()
         return TEAM_NORMALIZATION.get(stripped_name, stripped_name)
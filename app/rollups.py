@@ -0,0 +1,189 @@
+# In app/rollups.py
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import tuple_, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from . import models
+
+# --- Rollup Maintenance ---
+# A match contributes to the rollups as a whole: when it changes we subtract
+# what it contributed before and add what it contributes now. Deltas are
+# collected in memory and written in one pass, inside the caller's transaction.
+
+HERO_KEY = ("tournament_id", "stage", "team_id", "opponent_id", "hero_id", "side", "day")
+HERO_COUNTERS = ("picks", "bans", "wins")
+MATCH_KEY = ("tournament_id", "stage", "team1_id", "team2_id", "day")
+MATCH_COUNTERS = ("matches", "games")
+MATCHUP_KEY = ("tournament_id", "stage", "hero_id", "opponent_hero_id")
+MATCHUP_COUNTERS = ("games", "wins")
+MATCHUP_DAILY_KEY = ("day", "tournament_id", "stage", "hero_id", "opponent_hero_id")
+TEAM_KEY = ("tournament_id", "stage", "team_id", "side", "day")
+TEAM_COUNTERS = ("matches", "match_wins", "games", "game_wins")
+LOOKUP_CHUNK = 500 # Keys per statement, keeps us under bind parameter limits
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def day_bucket(match_date) -> str:
+    """The rollup day of a match date: 'YYYY-MM-DD', or '' without a date."""
+    return match_date.strftime("%Y-%m-%d") if match_date else ''
+
+
+def rollup_stage(match) -> str:
+    """
+    The stage a stored match is counted under: its stage_type column, or the
+    payload's for rows stored before that column was filled.
+    """
+    return match.stage_type if match.stage_type is not None else (match.details or {}).get('stage_type')
+
+
+class RollupDelta:
+    """Signed counter changes for the rollup tables, keyed by primary key."""
+
+    def __init__(self):
+        self.hero_rows = defaultdict(lambda: [0] * len(HERO_COUNTERS))
+        self.match_rows = defaultdict(lambda: [0] * len(MATCH_COUNTERS))
+        self.matchup_rows = defaultdict(lambda: [0] * len(MATCHUP_COUNTERS))
+        self.team_rows = defaultdict(lambda: [0] * len(TEAM_COUNTERS))
+        self.matchup_daily_rows = defaultdict(lambda: [0] * len(MATCHUP_COUNTERS))
+
+    def add_match(self, tournament_id, stage, team1_id, team2_id, winner_id, actions, sign=1, day=''):
+        """
+        Adds (sign=1) or removes (sign=-1) one match's contribution.
+        `actions` are (hero_id, team_id, type, game_number, is_win, side) tuples,
+        the same shape that is stored in match_heroes. `day` is the match's
+        day_bucket.
+        """
+        if winner_id is None:
+            return
+        stage = stage or ''
+
+        games = {action[3] for action in actions}
+        match_counters = self.match_rows[(tournament_id, stage, team1_id, team2_id, day)]
+        match_counters[0] += sign
+        match_counters[1] += sign * len(games)
+        for team_id in (team1_id, team2_id):
+            team_counters = self.team_rows[(tournament_id, stage, team_id, '', day)]
+            team_counters[0] += sign
+            if team_id == winner_id:
+                team_counters[1] += sign
+
+        picks_by_game = defaultdict(lambda: defaultdict(list)) # game -> team -> [(hero, is_win)]
+        team_games = defaultdict(lambda: ['', False]) # (game, team) -> [side, won]
+        for hero_id, team_id, action_type, game_num, is_win, side in actions:
+            team_game = team_games[(game_num, team_id)]
+            team_game[0] = team_game[0] or side or ''
+            team_game[1] = team_game[1] or bool(is_win)
+            opponent_id = team2_id if team_id == team1_id else team1_id
+            counters = self.hero_rows[(tournament_id, stage, team_id, opponent_id, hero_id, side or '', day)]
+            if action_type == 'pick':
+                counters[0] += sign
+                if is_win:
+                    counters[2] += sign
+                picks_by_game[game_num][team_id].append((hero_id, is_win))
+            else:
+                counters[1] += sign
+
+        for (game_num, team_id), (side, won) in team_games.items():
+            team_counters = self.team_rows[(tournament_id, stage, team_id, side, day)]
+            team_counters[2] += sign
+            if won:
+                team_counters[3] += sign
+
+        # Every pick faced every pick of the other team in the same game
+        for picks_by_team in picks_by_game.values():
+            for team_id, picks in picks_by_team.items():
+                opponent_picks = [hero_id for other_team, other in picks_by_team.items() if other_team != team_id for hero_id, _ in other]
+                for hero_id, is_win in picks:
+                    for opponent_hero_id in opponent_picks:
+                        for counters in (
+                            self.matchup_rows[(tournament_id, stage, hero_id, opponent_hero_id)],
+                            self.matchup_daily_rows[(day, tournament_id, stage, hero_id, opponent_hero_id)],
+                        ):
+                            counters[0] += sign
+                            if is_win:
+                                counters[1] += sign
+
+    def __bool__(self):
+        return any(any(c) for rows in (self.hero_rows, self.match_rows, self.matchup_rows, self.team_rows, self.matchup_daily_rows) for c in rows.values())
+
+
+def _upsert_rows(db: Session, model, key_names, counter_names, deltas):
+    """
+    Adds signed counter changes with INSERT ... ON CONFLICT DO UPDATE, so the
+    database does the arithmetic and concurrent ingestions can't lose each
+    other's updates. Rows whose counters reach zero are deleted afterwards.
+    """
+    # Sorted so concurrent writers lock rows in the same order
+    deltas = sorted((key, counters) for key, counters in deltas.items() if any(counters))
+    if not deltas:
+        return
+
+    table = model.__table__
+    stmt = UPSERT_DIALECTS[db.get_bind().dialect.name](table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key_names),
+        set_={name: table.c[name] + stmt.excluded[name] for name in counter_names}
+    )
+    # One executemany; the driver batches it into multi-row VALUES where it can (psycopg)
+    db.execute(stmt, [{**dict(zip(key_names, key)), **dict(zip(counter_names, counters))} for key, counters in deltas])
+
+    # Only a decrement can bring a row to zero
+    shrunk = [key for key, counters in deltas if any(change < 0 for change in counters)]
+    key_columns = tuple_(*(table.c[name] for name in key_names))
+    for start in range(0, len(shrunk), LOOKUP_CHUNK):
+        db.execute(delete(table).where(key_columns.in_(shrunk[start:start + LOOKUP_CHUNK]), *(table.c[name] == 0 for name in counter_names)))
+
+
+def apply_rollup_delta(db: Session, delta: RollupDelta):
+    """Writes the accumulated changes to the rollup tables (no commit)."""
+    _upsert_rows(db, models.HeroStatRollup, HERO_KEY, HERO_COUNTERS, delta.hero_rows)
+    _upsert_rows(db, models.MatchStatRollup, MATCH_KEY, MATCH_COUNTERS, delta.match_rows)
+    _upsert_rows(db, models.HeroMatchupRollup, MATCHUP_KEY, MATCHUP_COUNTERS, delta.matchup_rows)
+    _upsert_rows(db, models.TeamStatRollup, TEAM_KEY, TEAM_COUNTERS, delta.team_rows)
+    _upsert_rows(db, models.HeroMatchupDailyRollup, MATCHUP_DAILY_KEY, MATCHUP_COUNTERS, delta.matchup_daily_rows)
+
+
+def _full_delta(db: Session) -> RollupDelta:
+    """Every completed match's contribution, from matches and match_heroes."""
+    actions_by_match = defaultdict(set)
+    for mh in db.query(models.MatchHero).yield_per(5000):
+        actions_by_match[mh.match_id].add((mh.hero_id, mh.team_id, mh.type, mh.game_number, mh.is_win, mh.side))
+
+    delta = RollupDelta()
+    for match in db.query(models.Match).filter(models.Match.winner_id != None).yield_per(1000):
+        delta.add_match(match.tournament_id, rollup_stage(match), match.team1_id, match.team2_id, match.winner_id, actions_by_match.get(match.id, set()), day=day_bucket(match.match_date))
+    return delta
+
+
+def _insert_rows(db: Session, model, key_names, counter_names, rows):
+    # For empty tables: plain INSERTs, no conflict handling needed
+    values = [
+        {**dict(zip(key_names, key)), **dict(zip(counter_names, counters))}
+        for key, counters in rows.items() if any(counters)
+    ]
+    if values:
+        db.execute(insert(model), values)
+
+
+def rebuild_rollups(db: Session, commit: bool = True):
+    """
+    Recomputes every rollup table from matches and match_heroes.
+    Used to backfill an existing database or repair drift.
+    """
+    for model in (models.HeroStatRollup, models.MatchStatRollup, models.HeroMatchupRollup, models.TeamStatRollup, models.HeroMatchupDailyRollup):
+        db.query(model).delete(synchronize_session=False)
+
+    delta = _full_delta(db)
+    _insert_rows(db, models.HeroStatRollup, HERO_KEY, HERO_COUNTERS, delta.hero_rows)
+    _insert_rows(db, models.MatchStatRollup, MATCH_KEY, MATCH_COUNTERS, delta.match_rows)
+    _insert_rows(db, models.HeroMatchupRollup, MATCHUP_KEY, MATCHUP_COUNTERS, delta.matchup_rows)
+    _insert_rows(db, models.TeamStatRollup, TEAM_KEY, TEAM_COUNTERS, delta.team_rows)
+    _insert_rows(db, models.HeroMatchupDailyRollup, MATCHUP_DAILY_KEY, MATCHUP_COUNTERS, delta.matchup_daily_rows)
+    if commit:
+        db.commit()
+
+
+def rebuild_team_rollups(db: Session):
+    """Recomputes team_stat_rollups alone (no commit). Backfills the table for migration 3."""
+    db.query(models.TeamStatRollup).delete(synchronize_session=False)
+    _insert_rows(db, models.TeamStatRollup, TEAM_KEY, TEAM_COUNTERS, _full_delta(db).team_rows)
@@ -41,4 +41,37 @@ class HeroDetails(BaseModel):
     by_team: List[HeroPerformanceByTeam]
     vs_opponents: List[HeroPerformanceVsOpponent]
 
+class MatchupMatrix(BaseModel):
+    heroes: List[str]
+    games_faced: List[List[int]] # [hero][opponent]
+    wins: List[List[int]] # Games won by the row hero
+
+class TeamHeroPicks(BaseModel):
+    hero_name: str
+    picks: int
+    wins: int
+    win_rate: float
+
+class TeamStats(BaseModel):
+    team_name: str
+    series_played: int
+    series_wins: int
+    series_win_rate: float
+    games_played: int
+    game_wins: int
+    game_win_rate: float
+    blue_games: int
+    blue_wins: int
+    blue_win_rate: float
+    red_games: int
+    red_wins: int
+    red_win_rate: float
+    most_picked: List[TeamHeroPicks]
+
+class CompositionStats(BaseModel):
+    games: int # Games matching the composition, from the ally team's view
+    wins: int # Of those, games the ally team won
+    losses: int
+    win_rate: float
+
 # --- NEW SCHEMAS END ---
\ No newline at end of file
@@ -0,0 +1,128 @@
+# In app/serialization.py
+
+import os
+import gzip
+import json
+import struct
+from typing import Dict, Mapping, Optional
+from fastapi import Response
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without it
+    brotli = None
+
+load_dotenv()
+
+# --- Configuration ---
+# Bodies smaller than COMPRESS_MIN_BYTES are sent uncompressed; the headers
+# would cost about as much as compression saves.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# --- JSON Encoding ---
+
+def dumps(value) -> bytes:
+    """Encodes a response value as compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+def dumps_lines(values) -> bytes:
+    """Encodes values as newline-delimited JSON (one document per line)."""
+    return b"".join(dumps(value) + b"\n" for value in values)
+
+def _compress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def supported_encodings() -> tuple:
+    """Content codings we can produce, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """
+    Picks the preferred coding from `available` that the Accept-Encoding
+    header allows, or None for the identity coding.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.lower()] = quality
+    for coding in available:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+# --- Encoded Payloads ---
+
+class EncodedPayload:
+    """
+    A response body encoded once: the JSON bytes plus a compressed copy per
+    supported coding (bodies under COMPRESS_MIN_BYTES are kept uncompressed).
+    Caching these lets repeated hits skip both JSON encoding and compression.
+    """
+
+    def __init__(self, variants: Dict[str, bytes]):
+        self.variants = variants
+
+    @classmethod
+    def encode(cls, value, encodings=None) -> "EncodedPayload":
+        body = dumps(value)
+        variants = {"identity": body}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            for coding in supported_encodings() if encodings is None else encodings:
+                variants[coding] = _compress(coding, body)
+        return cls(variants)
+
+    def to_response(self, accept_encoding: Optional[str], headers: Optional[Mapping[str, str]] = None) -> Response:
+        coding = choose_encoding(accept_encoding, [c for c in supported_encodings() if c in self.variants])
+        response_headers = dict(headers or {})
+        response_headers["Vary"] = "Accept-Encoding"
+        if coding is not None:
+            response_headers["Content-Encoding"] = coding
+        return Response(self.variants[coding or "identity"], media_type="application/json", headers=response_headers)
+
+    # Framing for byte-oriented caches (Redis): a zero byte (never the first
+    # byte of a JSON document), the variant count, then name and body lengths.
+    def to_bytes(self) -> bytes:
+        parts = [b"\x00", struct.pack(">B", len(self.variants))]
+        for name, body in self.variants.items():
+            parts.append(struct.pack(">BI", len(name), len(body)))
+            parts.append(name.encode())
+            parts.append(body)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "EncodedPayload":
+        (count,) = struct.unpack_from(">B", raw, 1)
+        offset, variants = 2, {}
+        for _ in range(count):
+            name_length, body_length = struct.unpack_from(">BI", raw, offset)
+            offset += 5
+            name = raw[offset:offset + name_length].decode()
+            offset += name_length
+            variants[name] = raw[offset:offset + body_length]
+            offset += body_length
+        return cls(variants)
+
+    @staticmethod
+    def is_framed(raw: bytes) -> bool:
+        return raw[:1] == b"\x00"
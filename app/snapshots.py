@@ -0,0 +1,83 @@
+# In app/snapshots.py
+
+import os
+import json
+import gzip
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+
+# --- Raw Response Store ---
+# Layout:
+#   <root>/objects/ab/abcdef....json.gz   one gzip'd API response body, named by its SHA-256
+#   <root>/index.jsonl                    one line per fetch: tournament path, fetch time, page hashes
+# Identical responses are stored once, however often they are fetched.
+
+class SnapshotStore:
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+    def put(self, body: bytes) -> str:
+        """Stores one raw response body and returns its content hash."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so a crash never leaves a truncated object
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(body))
+            os.replace(tmp_path, path)
+        return digest
+
+    def record(self, tournament_path: str, pages: List[bytes], fetched_at: Optional[datetime] = None) -> dict:
+        """Stores every page of one tournament fetch and appends it to the index."""
+        entry = {
+            "path": tournament_path,
+            "fetched_at": (fetched_at or datetime.now(timezone.utc)).isoformat(),
+            "pages": [self.put(body) for body in pages],
+        }
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def entries(self) -> Iterator[dict]:
+        """Yields index entries, oldest first."""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def latest(self, tournament_path: str) -> Optional[dict]:
+        """Returns the most recent index entry for a tournament path, if any."""
+        found = None
+        for entry in self.entries():
+            if entry["path"] == tournament_path:
+                found = entry
+        return found
+
+    def iter_pages(self, entry: dict) -> Iterator[list]:
+        """Decodes an entry's pages one at a time, yielding each page's match list."""
+        for digest in entry["pages"]:
+            with gzip.open(self._object_path(digest), "rb") as f:
+                yield json.load(f).get("result", [])
+
+    def load_matches(self, entry: dict) -> list:
+        """Returns every raw match recorded in an entry."""
+        return [match for page in self.iter_pages(entry) for match in page]
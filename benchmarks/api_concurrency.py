@@ -0,0 +1,119 @@
+# In benchmarks/api_concurrency.py
+"""
+Compares sync (threadpool) and async endpoint handlers under mixed load:
+a few clients hammer the expensive /api/stats aggregate while others call
+the cheap /api/heroes list. Reports throughput and latency per endpoint.
+
+Runs in-process against the database in DATABASE_URL, with the response
+cache switched off so every request reaches the database (or, with
+ANALYTICS_ENGINE=memory, the in-process engine):
+
+    python -m benchmarks.api_concurrency --duration 10 --threads 8
+    ANALYTICS_ENGINE=memory python -m benchmarks.api_concurrency
+
+Run it against Postgres before drawing conclusions: on SQLite the async
+handlers go through aiosqlite, which runs every statement on its own thread,
+so they pay a thread hop per statement that asyncpg doesn't.
+"""
+
+import os
+os.environ["CACHE_BACKEND"] = "off"
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import crud
+from app.database import ReadSessionLocal
+from app.main import app as async_app, get_analytics_engine, load_analytics_engine
+
+SLOW_PATH = "/api/stats"
+FAST_PATH = "/api/heroes"
+
+def build_sync_app() -> FastAPI:
+    """The same two endpoints as sync `def` handlers on the sync session, as they were before."""
+    sync_app = FastAPI()
+    analytics = get_analytics_engine()
+    get_hero_stats = analytics.get_hero_stats if analytics else crud.get_hero_stats
+
+    @sync_app.get(SLOW_PATH)
+    def stats():
+        db = ReadSessionLocal()
+        try:
+            return get_hero_stats(db)
+        finally:
+            db.close()
+
+    @sync_app.get(FAST_PATH)
+    def heroes():
+        db = ReadSessionLocal()
+        try:
+            return [name for (name,) in crud.get_all_hero_names(db)]
+        finally:
+            db.close()
+
+    return sync_app
+
+async def run_load(app: FastAPI, duration: float, slow_clients: int, fast_clients: int, threads: int) -> dict:
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    latencies = {SLOW_PATH: [], FAST_PATH: []}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(path: str):
+        nonlocal errors
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await http.get(path)
+                if response.status_code != 200:
+                    errors += 1
+                latencies[path].append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[client(SLOW_PATH) for _ in range(slow_clients)], *[client(FAST_PATH) for _ in range(fast_clients)])
+
+    result = {"errors": errors}
+    for path, values in latencies.items():
+        values.sort()
+        result[path] = {
+            "requests": len(values),
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(statistics.median(values), 1) if values else None,
+            "p95_ms": round(values[int(len(values) * 0.95) - 1], 1) if values else None,
+        }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs. async endpoint throughput under mixed load.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per variant.")
+    parser.add_argument("--slow-clients", type=int, default=8, help=f"Concurrent clients calling {SLOW_PATH}.")
+    parser.add_argument("--fast-clients", type=int, default=8, help=f"Concurrent clients calling {FAST_PATH}.")
+    parser.add_argument("--threads", type=int, default=8, help="Threadpool size for sync handlers (FastAPI's default is 40).")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results.")
+    args = parser.parse_args()
+
+    # As the API's startup does, so neither variant times the first load
+    load_analytics_engine()
+    results = {}
+    for name, app in (("sync", build_sync_app()), ("async", async_app)):
+        results[name] = asyncio.run(run_load(app, args.duration, args.slow_clients, args.fast_clients, args.threads))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        for path in (SLOW_PATH, FAST_PATH):
+            r = result[path]
+            print(f"{name:6} {path:12} {r['requests']:6} req  {r['rps']:8} req/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms")
+        if result["errors"]:
+            print(f"{name:6} {result['errors']} failed requests")
+
+if __name__ == "__main__":
+    main()
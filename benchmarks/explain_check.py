@@ -0,0 +1,131 @@
+# In benchmarks/explain_check.py
+"""
+Index regression check: seeds a synthetic dataset, runs every crud read
+path, EXPLAINs each SQL statement they issue and fails (exit status 1) if
+any plan reads matches or match_heroes with a full table scan.
+
+    python -m benchmarks.explain_check                      # temporary SQLite database
+    python -m benchmarks.explain_check --database-url postgresql://.../scratch
+
+The database's tables are dropped and rebuilt through the migrations, so
+the check sees the indexes a migrated production database has. On
+PostgreSQL, sequential scans are disabled for the EXPLAIN so the planner
+only picks one when no index can serve the query, whatever the data size.
+"""
+
+import os
+import re
+import sys
+import copy
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import models, crud, migrations
+from app.processing import liquipedia_api
+from benchmarks.synthetic import generate_dataset
+from benchmarks.suite import read_cases
+
+LARGE_TABLES = ("matches", "match_heroes")
+
+# Cases that read every completed match by design; a full scan is the right plan
+FULL_SCAN_EXPECTED = {"get_all_teams", "get_all_stages"}
+
+def capture_statements(engine, fn):
+    """Runs fn and returns the (statement, parameters) pairs it executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+def _sqlite_full_scans(conn, statement, parameters):
+    # SQLite names aliased tables by their alias in plans
+    names = set(LARGE_TABLES)
+    for table, alias in re.findall(r"\b(" + "|".join(LARGE_TABLES) + r")\s+AS\s+(\w+)", statement):
+        names.add(alias)
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in plan if re.match(r"SCAN (\w+)", row[-1]) and re.match(r"SCAN (\w+)", row[-1]).group(1) in names]
+
+def _postgres_full_scans(conn, statement, parameters):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}" + (f" (filter: {node['Filter']})" if "Filter" in node else ""))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return scans
+
+def check(database_url: str, scale: dict, seed: int = 0) -> int:
+    """Returns the number of unexpected full scans found."""
+    engine = create_engine(database_url)
+    models.Base.metadata.drop_all(bind=engine)
+    migrations.schema_migrations.drop(engine, checkfirst=True)
+    migrations.upgrade(engine)
+
+    db = sessionmaker(autoflush=False, bind=engine)()
+    dataset = generate_dataset(seed=seed, **scale)
+    for tournament, matches in dataset.items():
+        crud.ingest_tournament_matches(db, tournament, liquipedia_api._enrich_matches(copy.deepcopy(matches)), region="Synthetic", split=tournament)
+    # No ANALYZE on SQLite: without statistics its planner uses any index that
+    # can serve a query, much like PostgreSQL with enable_seqscan off.
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    full_scans = _postgres_full_scans if engine.dialect.name == "postgresql" else _sqlite_full_scans
+    failures = 0
+    try:
+        for case, fn in read_cases(db, dataset).items():
+            statements = capture_statements(engine, fn)
+            db.rollback()
+            with engine.connect() as conn:
+                scans = [scan for statement, parameters in statements for scan in full_scans(conn, statement, parameters)]
+            if not scans:
+                status = "ok"
+            elif case in FULL_SCAN_EXPECTED:
+                status = "ok (full scan expected)"
+            else:
+                status = "FULL SCAN"
+                failures += 1
+            print(f"{status:24} {case} ({len(statements)} statements)")
+            for scan in scans if status == "FULL SCAN" else []:
+                print(f"{'':24}   {scan}")
+    finally:
+        db.close()
+        engine.dispose()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if a crud read path full-scans matches or match_heroes.")
+    parser.add_argument("--database-url", help="Scratch database to use (its tables are recreated). Defaults to a temporary SQLite file.")
+    parser.add_argument("--tournaments", type=int, default=4)
+    parser.add_argument("--series", type=int, default=150)
+    args = parser.parse_args()
+
+    scale = {"tournaments": args.tournaments, "series": args.series, "teams": 12, "hero_pool": 100}
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check(args.database_url or f"sqlite:///{os.path.join(tmp, 'explain.db')}", scale)
+    if failures:
+        print(f"{failures} read path(s) full-scan a large table.")
+        sys.exit(1)
+    print("No unexpected full scans.")
+
+if __name__ == "__main__":
+    main()
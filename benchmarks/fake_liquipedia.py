@@ -0,0 +1,103 @@
+# In benchmarks/fake_liquipedia.py
+"""
+A local stand-in for the Liquipedia /match API, serving synthetic matches
+(see benchmarks/synthetic.py) with the real API's offset/limit paging. Any
+tournament path is answered with a deterministic tournament of its own, so
+seeding can run end to end without an API key or network access:
+
+    python -m benchmarks.fake_liquipedia --port 8765 --series 120
+    LIQUIPEDIA_API_URL=http://127.0.0.1:8765/api/v3 LIQUIPEDIA_API_KEY=local python seed_db.py --no-record
+
+Every request's tournament, offset and limit is kept in `requests`, so tests
+can check which pages a client asked for.
+"""
+
+import re
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.synthetic import generate_tournament
+
+PARENT_CONDITION = re.compile(r"\[\[parent::(.+?)\]\]")
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if not url.path.endswith("/match"):
+            return self._reply(404, {"error": f"unknown endpoint {url.path}"})
+        if not self.headers.get("Authorization", "").startswith("Apikey "):
+            return self._reply(403, {"error": "missing API key"})
+
+        condition = PARENT_CONDITION.search(params.get("conditions", ""))
+        if condition is None:
+            return self._reply(400, {"error": "conditions must select a parent tournament"})
+        parent = condition.group(1)
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 500))
+        self.server.requests.append((parent, offset, limit))
+        self._reply(200, {"result": self.server.matches(parent)[offset:offset + limit]})
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # Quiet; the seeder prints its own progress
+
+class FakeLiquipediaServer(ThreadingHTTPServer):
+    """Serves `series` synthetic matches per tournament path. Port 0 picks a free port."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, series: int = 60, **tournament_options):
+        super().__init__((host, port), _Handler)
+        self.series = series
+        self.tournament_options = tournament_options
+        self.requests = []
+        self._tournaments = {}
+        self._lock = threading.Lock()
+
+    @property
+    def api_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    def matches(self, parent: str) -> list:
+        with self._lock:
+            if parent not in self._tournaments:
+                # The synthetic pagenames are the name with underscores, i.e. the parent path
+                name = parent.replace('_', ' ')
+                self._tournaments[parent] = generate_tournament(name, series=self.series, **self.tournament_options)
+            return self._tournaments[parent]
+
+    def start(self) -> "FakeLiquipediaServer":
+        """Serves from a background thread; call shutdown() to stop."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic matches through a fake Liquipedia /match API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--series", type=int, default=60, help="Series per tournament.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLiquipediaServer(args.host, args.port, series=args.series, seed=args.seed)
+    print(f"Fake Liquipedia API at {server.api_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# In benchmarks/startup.py
+"""
+Measures API cold start: the time to import app.main, to run its lifespan
+startup (pending migrations with MIGRATE_ON_STARTUP=true, the optional
+analytics engine load) and to answer the first and second request. Each run
+is a fresh interpreter, as a new container would be:
+
+    python -m benchmarks.startup                   # temporary SQLite database, 10 runs
+    python -m benchmarks.startup --runs 20 --path /api/hero-details
+    python -m benchmarks.startup --importtime      # also list the slowest imports
+
+The database in --database-url (default: a temporary SQLite file) is
+migrated and seeded with a small synthetic dataset first, so the timed
+startups find an up-to-date schema, as they do in production.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("import", "startup", "first_request", "second_request")
+
+# --- Child Process ---
+
+def run_child(path: str):
+    """Times one cold start in this (fresh) interpreter and prints the timings as JSON."""
+    start = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    import asyncio
+    import httpx
+
+    async def serve() -> dict:
+        timings = {"import": imported - start}
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = time.perf_counter() - started
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+                for phase in ("first_request", "second_request"):
+                    started = time.perf_counter()
+                    response = await http.get(path)
+                    timings[phase] = time.perf_counter() - started
+                    if response.status_code != 200:
+                        raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return timings
+
+    timings = asyncio.run(serve())
+    print(json.dumps({phase: round(seconds * 1000, 2) for phase, seconds in timings.items()}))
+
+# --- Parent Process ---
+
+def seed(database_url: str):
+    """Migrates the database and fills it with a small synthetic dataset."""
+    import copy
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import crud, migrations
+    from app.processing import liquipedia_api
+    from benchmarks.synthetic import generate_dataset
+
+    engine = create_engine(database_url)
+    migrations.upgrade(engine)
+    db = sessionmaker(autoflush=False, bind=engine)()
+    try:
+        for tournament, matches in generate_dataset(seed=0, tournaments=2, series=40, teams=8, hero_pool=60).items():
+            crud.ingest_tournament_matches(db, tournament, liquipedia_api._enrich_matches(copy.deepcopy(matches)), region="Synthetic", split=tournament)
+    finally:
+        db.close()
+        engine.dispose()
+
+def cold_start(env: dict, path: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--path", path],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(env: dict, limit: int):
+    """Prints the modules with the largest cumulative import time, via -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        # Top-level packages and the app's own modules; submodules are counted in their package
+        if "." not in name or name.startswith("app."):
+            rows.append((int(cumulative) / 1000, name))
+    for milliseconds, name in sorted(rows, reverse=True)[:limit]:
+        print(f"  {milliseconds:8.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Import, startup and first-request latency of the API.")
+    parser.add_argument("--runs", type=int, default=10, help="Cold starts to time.")
+    parser.add_argument("--path", default="/api/stats", help="Endpoint requested after startup.")
+    parser.add_argument("--database-url", help="Database to start against (migrated and seeded first). Defaults to a temporary SQLite file.")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports of app.main.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        run_child(args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Set before the app is first imported (by seed), so every process uses this database
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        seed(os.environ["DATABASE_URL"])
+        env = dict(os.environ)
+
+        runs = [cold_start(env, args.path) for _ in range(args.runs)]
+        for phase in PHASES:
+            samples = sorted(run[phase] for run in runs)
+            print(f"{phase:16} median {statistics.median(samples):9.2f} ms   min {samples[0]:9.2f} ms   max {samples[-1]:9.2f} ms")
+        if args.importtime:
+            print("Slowest imports of app.main (cumulative):")
+            slowest_imports(env, limit=15)
+
+if __name__ == "__main__":
+    main()
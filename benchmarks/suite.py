@@ -0,0 +1,217 @@
+# In benchmarks/suite.py
+"""
+Times ingestion and every crud read path on synthetic datasets of several
+sizes, and writes the results as JSON so runs can be compared between
+commits:
+
+    python -m benchmarks.suite                        # all scales, results in benchmarks/results/<commit>.json
+    python -m benchmarks.suite --scales small --repeat 3
+    python -m benchmarks.suite --compare benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+
+Each scale runs against a fresh SQLite file unless --database-url names an
+(empty) database to use instead; its tables are dropped and recreated.
+"""
+
+import os
+import sys
+import json
+import time
+import copy
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sqlalchemy
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import models, crud
+from app.processing import liquipedia_api
+from benchmarks.synthetic import generate_dataset
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SCALES = {
+    "small": {"tournaments": 2, "series": 40, "teams": 8, "hero_pool": 60},
+    "medium": {"tournaments": 6, "series": 120, "teams": 12, "hero_pool": 100},
+    "large": {"tournaments": 12, "series": 300, "teams": 16, "hero_pool": 120},
+}
+
+# --- Timing ---
+
+def time_call(fn: Callable[[], object], repeat: int) -> dict:
+    """Runs fn `repeat` times (after one warm-up call) and summarizes the wall times in ms."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+        "repeat": repeat,
+    }
+
+def read_cases(db, dataset: Dict[str, list]) -> Dict[str, Callable[[], object]]:
+    """One callable per crud read path and representative filter set."""
+    tournaments = list(dataset)
+    first = tournaments[:1]
+    teams = [team for (team,) in db.query(models.Team.name).order_by(models.Team.name).limit(2).all()]
+    heroes = [hero for (hero,) in crud.get_all_hero_names(db)]
+    top_hero = crud.get_hero_stats(db)["summary"]["most_picked"]["hero_name"]
+    # Two weeks, a week into the synthetic season
+    two_weeks = {"date_from": date(2025, 1, 8), "date_to": date(2025, 1, 21)}
+    return {
+        "get_all_tournaments_grouped[split]": lambda: crud.get_all_tournaments_grouped(db, group_by="split"),
+        "get_all_tournaments_grouped[region]": lambda: crud.get_all_tournaments_grouped(db, group_by="region"),
+        "get_all_teams": lambda: crud.get_all_teams(db),
+        "get_all_teams[tournament]": lambda: crud.get_all_teams(db, tournament_names=first),
+        "get_all_teams[hero]": lambda: crud.get_all_teams(db, hero_name=top_hero),
+        "get_all_stages": lambda: crud.get_all_stages(db),
+        "get_all_stages[tournament]": lambda: crud.get_all_stages(db, tournament_names=first),
+        "get_all_hero_names": lambda: crud.get_all_hero_names(db),
+        "get_data_version": lambda: crud.get_data_version(db),
+        "get_hero_stats": lambda: crud.get_hero_stats(db),
+        "get_hero_stats[tournament]": lambda: crud.get_hero_stats(db, tournament_names=first),
+        "get_hero_stats[tournament,stage]": lambda: crud.get_hero_stats(db, tournament_names=first, stage_names=["Playoffs"]),
+        "get_hero_stats[teams]": lambda: crud.get_hero_stats(db, team_names=teams),
+        "get_hero_stats[14 days]": lambda: crud.get_hero_stats(db, **two_weeks),
+        "get_hero_details": lambda: crud.get_hero_details(db, top_hero),
+        "get_hero_details[14 days]": lambda: crud.get_hero_details(db, top_hero, **two_weeks),
+        "get_hero_details[tournament,stage]": lambda: crud.get_hero_details(db, top_hero, tournament_names=first, stage_names=["Regular Season"]),
+        "get_hero_details[teams]": lambda: crud.get_hero_details(db, top_hero, team_names=teams),
+        "get_hero_details_batch[all]": lambda: crud.get_hero_details_batch(db),
+        "get_hero_details_batch[10,teams]": lambda: crud.get_hero_details_batch(db, heroes[:10], team_names=teams),
+        "get_team_stats": lambda: crud.get_team_stats(db),
+        "get_team_stats[14 days]": lambda: crud.get_team_stats(db, **two_weeks),
+        "get_team_stats[tournament,stage]": lambda: crud.get_team_stats(db, tournament_names=first, stage_names=["Playoffs"]),
+        "get_matchup_matrix": lambda: crud.get_matchup_matrix(db),
+        "get_matchup_matrix[tournament]": lambda: crud.get_matchup_matrix(db, tournament_names=first),
+    }
+
+# --- Runs ---
+
+def run_scale(name: str, params: dict, database_url: str, repeat: int, seed: int) -> dict:
+    dataset = generate_dataset(seed=seed, **params)
+    enriched = {tournament: liquipedia_api._enrich_matches(copy.deepcopy(matches)) for tournament, matches in dataset.items()}
+    match_count = sum(len(matches) for matches in enriched.values())
+
+    engine = create_engine(database_url)
+    db = sessionmaker(autoflush=False, bind=engine)()
+
+    def reset_schema():
+        db.close()
+        models.Base.metadata.drop_all(bind=engine)
+        models.Base.metadata.create_all(bind=engine)
+
+    def ingest_all(per_match: bool) -> float:
+        start = time.perf_counter()
+        for tournament, matches in enriched.items():
+            if per_match:
+                for match in matches:
+                    crud.update_tournament_and_match(db, match, region="Synthetic", split=tournament)
+            else:
+                crud.ingest_tournament_matches(db, tournament, matches, region="Synthetic", split=tournament)
+        return time.perf_counter() - start
+
+    try:
+        # Ingestion: one match per transaction, as the webhook path used to store them...
+        reset_schema()
+        single_seconds = ingest_all(per_match=True)
+        # ...one transaction per tournament into an empty database, as seed_db.py does...
+        reset_schema()
+        batch_seconds = ingest_all(per_match=False)
+        # ...and an unchanged refresh of every tournament
+        refresh_seconds = ingest_all(per_match=False)
+
+        print(f"[{name}] ingested {match_count} matches in {single_seconds:.2f}s one by one, {batch_seconds:.2f}s per tournament")
+        reads = {}
+        for case, fn in read_cases(db, dataset).items():
+            reads[case] = time_call(fn, repeat)
+            print(f"[{name}] {case:40} median {reads[case]['median_ms']:9.3f} ms")
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {
+        "params": params,
+        "matches": match_count,
+        "games": sum(len(m["match2games"]) for matches in enriched.values() for m in matches),
+        "ingest": {
+            "update_tournament_and_match": {"seconds": round(single_seconds, 3), "matches_per_second": round(match_count / single_seconds, 1)},
+            "ingest_tournament_matches[new]": {"seconds": round(batch_seconds, 3), "matches_per_second": round(match_count / batch_seconds, 1)},
+            "ingest_tournament_matches[unchanged]": {"seconds": round(refresh_seconds, 3), "matches_per_second": round(match_count / refresh_seconds, 1)},
+        },
+        "reads": reads,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(old_path: str, new_path: str):
+    """Prints new/old median ratios for every case both result files share."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    for scale in new["scales"]:
+        if scale not in old["scales"]:
+            continue
+        before, after = old["scales"][scale], new["scales"][scale]
+        for case, result in after["ingest"].items():
+            if case in before["ingest"]:
+                ratio = result["seconds"] / before["ingest"][case]["seconds"]
+                print(f"[{scale}] {case:40} {ratio:6.2f}x  ({before['ingest'][case]['seconds']}s -> {result['seconds']}s)")
+        for case, result in after["reads"].items():
+            if case in before["reads"]:
+                ratio = result["median_ms"] / before["reads"][case]["median_ms"]
+                print(f"[{scale}] {case:40} {ratio:6.2f}x  ({before['reads'][case]['median_ms']} ms -> {result['median_ms']} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion and read-path benchmarks on synthetic data.")
+    parser.add_argument("--scales", default=",".join(SCALES), help=f"Comma-separated subset of: {', '.join(SCALES)}.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per read case.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Database to benchmark against (its tables are recreated). Defaults to a temporary SQLite file.")
+    parser.add_argument("--output", help="Results file. Defaults to benchmarks/results/<commit>.json.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files instead of running.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "database": None,
+        "seed": args.seed,
+        "scales": {},
+    }
+    for name in args.scales.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            results["database"] = sqlalchemy.engine.make_url(database_url).get_backend_name()
+            results["scales"][name] = run_scale(name, SCALES[name], database_url, args.repeat, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# In benchmarks/synthetic.py
+"""
+Generates Liquipedia-shaped match payloads (the /match API's `result`
+entries) at a configurable scale, for benchmarks and local experiments.
+Output is deterministic for a given seed.
+
+    python -m benchmarks.synthetic --tournaments 3 --series 100 --out matches.json
+"""
+
+import json
+import zlib
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+STAGES = ("Regular_Season", "Playoffs")
+PICKS_PER_TEAM = 5
+BANS_PER_TEAM = 5
+
+def hero_names(hero_pool: int) -> List[str]:
+    return [f"Hero {i:03d}" for i in range(hero_pool)]
+
+def generate_tournament(
+    name: str,
+    series: int = 60,
+    teams: int = 10,
+    hero_pool: int = 120,
+    best_of: tuple = (3, 3, 5),
+    unfinished_rate: float = 0.05,
+    seed: int = 0,
+) -> List[dict]:
+    """
+    Returns `series` raw matches for one tournament between `teams` teams.
+    Series length is drawn from `best_of` and played until a team has the
+    majority. Heroes are drafted from a skewed pool so a few are "meta"
+    and most are situational, like real drafts. A share of the matches is
+    left without a winner, as for matches that are scheduled or in progress.
+    """
+    if hero_pool < 2 * (PICKS_PER_TEAM + BANS_PER_TEAM):
+        raise ValueError(f"hero_pool must be at least {2 * (PICKS_PER_TEAM + BANS_PER_TEAM)} to fill a draft")
+    rng = random.Random(seed * 1_000_003 + zlib.crc32(name.encode()))
+    pagename = name.replace(' ', '_')
+    team_names = [f"{name} Team {i:02d}" for i in range(teams)]
+    heroes = hero_names(hero_pool)
+    # Zipf-like popularity: hero k is picked about 1/(k+1)^0.8 as often as the top hero
+    weights = [1 / (k + 1) ** 0.8 for k in range(hero_pool)]
+    start = datetime(2025, 1, 1, 12, 0, 0)
+
+    def draft(count: int, taken: set) -> List[str]:
+        chosen = []
+        while len(chosen) < count:
+            hero = rng.choices(heroes, weights)[0]
+            if hero not in taken:
+                taken.add(hero)
+                chosen.append(hero)
+        return chosen
+
+    matches = []
+    for s in range(series):
+        team1, team2 = rng.sample(team_names, 2)
+        stage = STAGES[0] if s < series * 0.8 else STAGES[-1]
+        finished = rng.random() >= unfinished_rate
+        length = rng.choice(best_of)
+        needed = length // 2 + 1
+
+        games, wins = [], {"1": 0, "2": 0}
+        while finished and max(wins.values()) < needed:
+            taken = set()
+            extradata = {"team1side": "blue" if len(games) % 2 == 0 else "red"}
+            extradata["team2side"] = "red" if extradata["team1side"] == "blue" else "blue"
+            for team_num in ("1", "2"):
+                for i, hero in enumerate(draft(BANS_PER_TEAM, taken), start=1):
+                    extradata[f"team{team_num}ban{i}"] = hero
+            opponents = [{"players": [{"champion": hero} for hero in draft(PICKS_PER_TEAM, taken)]} for _ in range(2)]
+            winner = rng.choice(("1", "2"))
+            wins[winner] += 1
+            games.append({"winner": winner, "extradata": extradata, "opponents": opponents})
+
+        page = f"{pagename}/{stage}"
+        matches.append({
+            "match2id": f"{pagename}_R{s:04d}",
+            # As on Liquipedia, the id of the wiki page the match is on, shared by its matches
+            "pageid": zlib.crc32(page.encode()) & 0x7FFFFFFF,
+            "pagename": page,
+            "section": "",
+            "tournament": name,
+            "date": (start + timedelta(hours=6 * s)).strftime("%Y-%m-%d %H:%M:%S"),
+            "winner": ("1" if wins["1"] > wins["2"] else "2") if finished else "",
+            "bestof": length,
+            "team1score": wins["1"],
+            "team2score": wins["2"],
+            "match2opponents": [{"name": team1, "score": wins["1"]}, {"name": team2, "score": wins["2"]}],
+            "match2games": games,
+        })
+    return matches
+
+def generate_dataset(tournaments: int = 3, seed: int = 0, **kwargs) -> dict:
+    """Returns {tournament name: raw matches} for `tournaments` tournaments."""
+    return {
+        f"Synthetic League Season {t + 1}": generate_tournament(f"Synthetic League Season {t + 1}", seed=seed, **kwargs)
+        for t in range(tournaments)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Liquipedia match payloads.")
+    parser.add_argument("--tournaments", type=int, default=3)
+    parser.add_argument("--series", type=int, default=60, help="Series per tournament.")
+    parser.add_argument("--teams", type=int, default=10, help="Teams per tournament.")
+    parser.add_argument("--hero-pool", type=int, default=120)
+    parser.add_argument("--best-of", type=int, nargs="+", default=[3, 3, 5], help="Series lengths to draw from.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="-", help="Output JSON file ('-' for stdout).")
+    args = parser.parse_args()
+
+    dataset = generate_dataset(args.tournaments, seed=args.seed, series=args.series, teams=args.teams, hero_pool=args.hero_pool, best_of=tuple(args.best_of))
+    text = json.dumps(dataset)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+if __name__ == "__main__":
+    main()
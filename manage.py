@@ -0,0 +1,60 @@
+# In manage.py
+
+import argparse
+from app.database import SessionLocal, engine
+from app import rollups, migrations
+
+# --- Maintenance Commands ---
+
+def rebuild_rollups_command(args):
+    """Recomputes the stat rollup tables from matches and match_heroes."""
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        rollups.rebuild_rollups(db)
+        print("Rollup tables rebuilt.")
+    finally:
+        db.close()
+
+def migrate_command(args):
+    """Applies pending schema migrations (see app/migrations.py)."""
+    if args.list:
+        applied = migrations.applied_versions(engine)
+        for version, name, _ in migrations.MIGRATIONS:
+            print(f"{'applied' if version in applied else 'pending':8} {version:3}  {name}")
+        return
+    migrations.upgrade(engine)
+    print("Schema is up to date.")
+
+def backfill_stages_command(args):
+    """
+    Fills Match.stage_type and stage_priority for rows stored before they were
+    columns, then rebuilds the rollups, which counted those matches under an
+    empty stage.
+    """
+    db = SessionLocal()
+    try:
+        filled = migrations.backfill_match_stages(db)
+        db.commit()
+        print(f"Backfilled stage columns for {filled} matches.")
+        if filled:
+            rollups.rebuild_rollups(db)
+            print("Rollup tables rebuilt.")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="MLBB analytics maintenance commands.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    subcommands.add_parser("rebuild-rollups", help="Rebuild the stat rollup tables from raw pick/ban rows.").set_defaults(func=rebuild_rollups_command)
+    migrate_parser = subcommands.add_parser("migrate", aliases=["upgrade-schema"], help="Apply pending schema migrations.")
+    migrate_parser.add_argument("--list", action="store_true", help="Show applied and pending migrations instead.")
+    migrate_parser.set_defaults(func=migrate_command)
+    subcommands.add_parser("backfill-stages", help="Fill the stage_type/stage_priority columns of existing matches.").set_defaults(func=backfill_stages_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,119 @@
 # In seed_db.py
 
 import json
+import queue
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
-from app import models, crud
+from app import crud, migrations
 from app.processing import liquipedia_api
+from app.snapshots import SnapshotStore
 
-def seed_database():
-    """
-    Reads tournaments from tournaments.json, fetches their data from the
-    Liquipedia API, and populates the database.
-    """
-    db: Session = SessionLocal()
-    # This creates tables if they don't exist
-    models.Base.metadata.create_all(bind=engine)
-
+def load_tournament_configs(path: str = "tournaments.json"):
+    """Reads and validates the tournament list. Returns None if the file is missing."""
     try:
-        with open("tournaments.json", "r") as f:
+        with open(path, "r") as f:
             tournaments_to_seed = json.load(f)
     except FileNotFoundError:
-        print("ERROR: tournaments.json not found. Please create it.")
-        db.close()
-        return
+        print(f"ERROR: {path} not found. Please create it.")
+        return None
 
     print(f"Found {len(tournaments_to_seed)} tournaments to process from config file.")
 
-    for tournament_config in tqdm(tournaments_to_seed, desc="Processing Tournaments"):
-        liquipedia_name = tournament_config.get("liquipedia_name")
-        display_name = tournament_config.get("display_name")
-        region = tournament_config.get("region")
-        split = tournament_config.get("split")
-
-        if not all([liquipedia_name, display_name, region, split]):
+    valid_configs = []
+    for tournament_config in tournaments_to_seed:
+        if not all(tournament_config.get(key) for key in ("liquipedia_name", "display_name", "region", "split")):
             print(f"\nWARNING: Skipping invalid tournament entry: {tournament_config}")
             continue
+        valid_configs.append(tournament_config)
+    return valid_configs
+
+def seed_database(workers: int = 4, queue_size: int = 4, record: bool = True, replay: bool = False):
+    """
+    Reads tournaments from tournaments.json, fetches their data from the
+    Liquipedia API, and populates the database.
+
+    Up to `workers` tournaments are fetched concurrently. Fetched tournaments
+    wait in a queue of at most `queue_size` entries while this thread writes
+    them to the database, so writes overlap with network I/O and fetchers
+    pause when the writer falls behind.
+
+    With `record`, raw API responses are saved to the snapshot store. With
+    `replay`, the database is rebuilt from the latest snapshot of each
+    tournament instead, with no network access; tournaments are decoded one
+    at a time so memory use does not grow with the archive.
+    """
+    # This creates tables and indexes if they don't exist
+    migrations.upgrade(engine)
+
+    tournament_configs = load_tournament_configs()
+    if tournament_configs is None:
+        return
+
+    snapshots = SnapshotStore() if record or replay else None
+    if replay:
+        workers, queue_size = 1, 1
 
+    fetched = queue.Queue(maxsize=queue_size)
+    writer_done = threading.Event()
+
+    def fetch(tournament_config):
+        # The API handler returns clean, enriched data ([] on API errors)
         try:
-            # The API handler now returns clean, enriched data
-            enriched_matches = liquipedia_api.get_tournament_matches(liquipedia_name)
-            
-            if not enriched_matches:
-                print(f"\nNo match data found or an API error occurred for {display_name}.")
+            if replay:
+                enriched_matches = liquipedia_api.replay_tournament_matches(tournament_config["liquipedia_name"], snapshots)
+            else:
+                enriched_matches = liquipedia_api.get_tournament_matches(tournament_config["liquipedia_name"], snapshots=snapshots)
+        except Exception as e:
+            print(f"\nAn unexpected error occurred while fetching {tournament_config['display_name']}: {e}")
+            enriched_matches = []
+        # Waits in short steps so a fetcher can't block forever on a full
+        # queue after the writer has stopped
+        while not writer_done.is_set():
+            try:
+                fetched.put((tournament_config, enriched_matches), timeout=0.5)
+                return
+            except queue.Full:
                 continue
 
-            for match_data in tqdm(enriched_matches, desc=f"Seeding {display_name}", leave=False):
-                # Add the display name for the tournament to the match data
-                match_data["tournament"] = display_name
-                
-                # Call the CRUD function to save to the database
-                crud.update_tournament_and_match(db, match_data, region, split)
+    db: Session = SessionLocal()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        for tournament_config in tournament_configs:
+            pool.submit(fetch, tournament_config)
 
-        except Exception as e:
-            print(f"\nAn unexpected error occurred while processing {display_name}: {e}")
+        for _ in tqdm(range(len(tournament_configs)), desc="Processing Tournaments"):
+            tournament_config, enriched_matches = fetched.get()
+            display_name = tournament_config["display_name"]
+
+            if not enriched_matches:
+                source = "snapshot" if replay else "match data"
+                print(f"\nNo {source} found or an API error occurred for {display_name}.")
+                continue
+
+            try:
+                # One transaction per tournament
+                result = crud.ingest_tournament_matches(db, display_name, enriched_matches, tournament_config["region"], tournament_config["split"])
+                tqdm.write(f"{display_name}: {result['inserted']} new, {result['updated']} updated, {result['unchanged']} unchanged, {result['skipped']} skipped.")
+            except Exception as e:
+                print(f"\nAn unexpected error occurred while processing {display_name}: {e}")
+    finally:
+        # If the writer stops early (an error or Ctrl+C), drop the fetches that
+        # haven't started and let the waiting ones give up
+        writer_done.set()
+        pool.shutdown(cancel_futures=True)
+        db.close()
 
     print("Database seeding complete.")
-    db.close()
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the database from the Liquipedia API.")
+    parser.add_argument("--workers", type=int, default=4, help="Tournaments to fetch concurrently.")
+    parser.add_argument("--queue-size", type=int, default=4, help="Fetched tournaments allowed to wait for the database writer.")
+    parser.add_argument("--no-record", action="store_true", help="Do not save raw API responses to the snapshot store.")
+    parser.add_argument("--replay", action="store_true", help="Rebuild from recorded snapshots instead of calling the API.")
+    args = parser.parse_args()
+    seed_database(workers=args.workers, queue_size=args.queue_size, record=not args.no_record, replay=args.replay)
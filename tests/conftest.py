@@ -0,0 +1,12 @@
+# In tests/conftest.py
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Set before anything imports app.database, which binds its engines at import.
+# load_dotenv doesn't override it, so a .env pointing at a real database is safe.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mlbb-tests-'), 'test.db')}"
+os.environ.setdefault("LIQUIPEDIA_API_KEY", "test")
@@ -0,0 +1,81 @@
+# In tests/test_seed_pagination.py
+import json
+import threading
+
+import pytest
+
+import seed_db
+from app import crud, models, processing
+from app.database import SessionLocal
+from benchmarks.fake_liquipedia import FakeLiquipediaServer
+
+PAGE_LIMIT = 7
+
+@pytest.fixture
+def fake_liquipedia(monkeypatch):
+    """A fake /match API on a free port, with the seeder's page size cut to PAGE_LIMIT."""
+    server = FakeLiquipediaServer(series=30).start()
+    monkeypatch.setattr(processing, "LIQUIPEDIA_API_URL", server.api_url)
+    monkeypatch.setitem(processing.BASE_PARAMS, "limit", PAGE_LIMIT)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def write_configs(tmp_path, monkeypatch, paths):
+    """Writes a tournaments.json for `paths` and makes it the one seed_db reads."""
+    configs = [
+        {"liquipedia_name": path, "display_name": path.replace('_', ' '), "region": "Test", "split": "Test"}
+        for path in paths
+    ]
+    (tmp_path / "tournaments.json").write_text(json.dumps(configs))
+    monkeypatch.chdir(tmp_path)
+    return configs
+
+def stored_matches(display_name: str) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(models.Match).join(models.Tournament).filter(models.Tournament.name == display_name).count()
+    finally:
+        db.close()
+
+def test_seeding_walks_every_offset(fake_liquipedia, tmp_path, monkeypatch):
+    # 30 matches: four full pages and a short one. 28 matches end on a full
+    # page, so the seeder has to ask for an empty fifth page to know it's done.
+    fake_liquipedia.series = 30
+    configs = write_configs(tmp_path, monkeypatch, ["Pagination/Season_1"])
+    seed_db.seed_database(workers=2, record=False)
+
+    fake_liquipedia.series = 28
+    configs += write_configs(tmp_path, monkeypatch, ["Pagination/Season_2"])
+    seed_db.seed_database(workers=2, record=False)
+
+    for config, series in zip(configs, (30, 28)):
+        path = config["liquipedia_name"]
+        offsets = [offset for parent, offset, limit in fake_liquipedia.requests if parent == path]
+        assert offsets == list(range(0, series + 1, PAGE_LIMIT))
+        assert stored_matches(config["display_name"]) == series
+
+def test_writer_failure_does_not_hang_fetchers(fake_liquipedia, tmp_path, monkeypatch):
+    class WriterStopped(BaseException):
+        pass
+
+    def fail(*args, **kwargs):
+        raise WriterStopped()
+
+    write_configs(tmp_path, monkeypatch, [f"Stalled/Season_{i}" for i in range(6)])
+    monkeypatch.setattr(crud, "ingest_tournament_matches", fail)
+
+    # One queue slot and more fetchers than that: once the writer raises,
+    # the other fetchers are left waiting to put their tournaments.
+    result = {}
+    def run():
+        try:
+            seed_db.seed_database(workers=4, queue_size=1, record=False)
+        except WriterStopped:
+            result["raised"] = True
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "seed_database hung after the writer failed"
+    assert result.get("raised")
@@ -1,21 +1,122 @@
 # In worker.py
 
+import os
+import time
+import uuid
+import redis
+from contextlib import contextmanager
 from celery import Celery
+from dotenv import load_dotenv
 from app.database import SessionLocal
 from app.processing import liquipedia_api
 from app import crud, models
 
+load_dotenv()
+
 # Configure Celery
 # Make sure your REDIS_URL is set in your .env file
-celery_app = Celery("worker", broker="redis://localhost:6379/0", backend="redis://localhost:6379/0")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+celery_app = Celery("worker", broker=REDIS_URL, backend=REDIS_URL)
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# --- Webhook Coalescing ---
+# Live broadcasts send bursts of webhooks for the same page. Only the first
+# webhook in a burst queues a refresh, delayed by the debounce window; the
+# rest are absorbed while that refresh is pending. Once a refresh starts it
+# clears the pending marker, so a webhook arriving mid-refresh queues exactly
+# one follow-up. A per-page lock keeps two refreshes of a page from overlapping.
+REFRESH_DEBOUNCE_SECONDS = int(os.getenv("REFRESH_DEBOUNCE_SECONDS", "30"))
+REFRESH_PENDING_TTL = 3600 # Safety net so a lost task can't block a page forever
+REFRESH_LOCK_TTL = 900
+REFRESH_COUNTERS_KEY = "refresh:counters"
+
+# --- Refresh Phase Timings ---
+# Kept in Redis as a histogram (cumulative bucket counts, sum, count per
+# phase) so the API process can export them on /metrics.
+REFRESH_PHASES = ("fetch", "enrich", "write")
+REFRESH_PHASE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+REFRESH_TIMINGS_KEY = "refresh:phase_timings"
+
+def _pending_key(page: str) -> str:
+    return f"refresh:pending:{page}"
+
+def _lock_key(page: str) -> str:
+    return f"refresh:running:{page}"
+
+def schedule_refresh(page: str, tournament_name: str) -> bool:
+    """
+    Queues a debounced refresh for a page unless one is already pending.
+    Returns True if a refresh was queued, False if the webhook was coalesced.
+    """
+    redis_client.hincrby(REFRESH_COUNTERS_KEY, "received", 1)
+    if not redis_client.set(_pending_key(page), tournament_name, nx=True, ex=REFRESH_PENDING_TTL):
+        redis_client.hincrby(REFRESH_COUNTERS_KEY, "coalesced", 1)
+        return False
+    try:
+        process_liquipedia_update.apply_async((page, tournament_name), countdown=REFRESH_DEBOUNCE_SECONDS)
+    except Exception:
+        # Nothing was queued; without this the page's webhooks would be
+        # coalesced into a refresh that never runs until the key expires
+        redis_client.delete(_pending_key(page))
+        raise
+    return True
+
+def get_refresh_counters() -> dict:
+    """Returns how many webhooks were received and coalesced, and how many refreshes ran."""
+    counters = redis_client.hgetall(REFRESH_COUNTERS_KEY)
+    return {name: int(counters.get(name.encode(), 0)) for name in ("received", "coalesced", "executed")}
+
+def record_phase_time(phase: str, seconds: float):
+    pipe = redis_client.pipeline()
+    pipe.hincrby(REFRESH_TIMINGS_KEY, f"{phase}:count", 1)
+    pipe.hincrbyfloat(REFRESH_TIMINGS_KEY, f"{phase}:sum", seconds)
+    for bound in REFRESH_PHASE_BUCKETS:
+        if seconds <= bound:
+            pipe.hincrby(REFRESH_TIMINGS_KEY, f"{phase}:le:{bound}", 1)
+    pipe.execute()
+
+def get_phase_timings() -> dict:
+    """Returns {phase: (cumulative bucket counts, sum, count)} for REFRESH_PHASE_BUCKETS."""
+    fields = {key.decode(): value for key, value in redis_client.hgetall(REFRESH_TIMINGS_KEY).items()}
+    return {
+        phase: (
+            [int(fields.get(f"{phase}:le:{bound}", 0)) for bound in REFRESH_PHASE_BUCKETS],
+            float(fields.get(f"{phase}:sum", 0)),
+            int(fields.get(f"{phase}:count", 0)),
+        )
+        for phase in REFRESH_PHASES
+    }
+
+@contextmanager
+def timed_phase(phase: str, timings: dict):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+        record_phase_time(phase, timings[phase])
 
 @celery_app.task
 def process_liquipedia_update(page: str, tournament_name: str):
     """
     Celery task to handle a webhook update from Liquipedia.
     """
+    lock_token = str(uuid.uuid4())
+    if not redis_client.set(_lock_key(page), lock_token, nx=True, ex=REFRESH_LOCK_TTL):
+        # Another refresh of this page is still running. Keep our pending marker
+        # so further webhooks stay coalesced into us, and try again later.
+        redis_client.expire(_pending_key(page), REFRESH_PENDING_TTL)
+        process_liquipedia_update.apply_async((page, tournament_name), countdown=REFRESH_DEBOUNCE_SECONDS)
+        return
+
+    # From here on, a new webhook schedules a follow-up refresh.
+    redis_client.delete(_pending_key(page))
+    redis_client.hincrby(REFRESH_COUNTERS_KEY, "executed", 1)
+
     print(f"Processing update for: {tournament_name}")
+    # Writes always go to the primary, even when the API reads from a replica
     db = SessionLocal()
+    timings = {}
     try:
         # 1. Find the tournament in our database to get its region and split.
         tournament = db.query(models.Tournament).filter_by(name=tournament_name).first()
@@ -25,27 +126,33 @@ def process_liquipedia_update(page: str, tournament_name: str):
             return
 
         # 2. Fetch the latest match data from the API.
-        enriched_matches = liquipedia_api.get_tournament_matches(page)
+        with timed_phase("fetch", timings):
+            raw_matches = liquipedia_api.fetch_raw_matches(page)
+        with timed_phase("enrich", timings):
+            enriched_matches = liquipedia_api._enrich_matches(raw_matches)
 
         if not enriched_matches:
             print(f"No match data found for updated page: {page}")
             return
 
-        # 3. Process each match using the correct function and the data from our database.
-        for match_data in enriched_matches:
-            match_data["tournament"] = tournament.name # Ensure display name is consistent
-            
-            # Use the correct, renamed function
-            crud.update_tournament_and_match(
+        # 3. Store every match in a single transaction, using the region and split from our database.
+        # The commit bumps the tournament's data_version, which invalidates the
+        # API's cached responses for it (see app/cache.py).
+        with timed_phase("write", timings):
+            result = crud.ingest_tournament_matches(
                 db, 
-                match_data, 
+                tournament.name, # Ensure display name is consistent
+                enriched_matches, 
                 region=tournament.region, 
                 split=tournament.split
             )
+        print(f"{result['inserted']} new, {result['updated']} updated and {result['unchanged']} unchanged matches for: {tournament_name}")
         
-        print(f"Successfully processed update for: {tournament_name}")
+        print(f"Successfully processed update for: {tournament_name} (" + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items()) + ")")
         
     except Exception as e:
         print(f"An error occurred during webhook processing for {tournament_name}: {e}")
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if redis_client.get(_lock_key(page)) == lock_token.encode():
+            redis_client.delete(_lock_key(page))
\ No newline at end of file